@@ -1,60 +1,39 @@
 import frappe
-from at_biometric_integration.utils import biometric_sync, checkin_processing, attendance_processing, cleanup
+from at_biometric_integration.utils import pipeline
 
 @frappe.whitelist()
 def fetch_and_upload_attendance():
     """
-    Controller - called manually via API or scheduler.
-    - fetch logs
-    - process logs into checkins
-    - create Attendance records (via your existing helper)
-    - try auto-submitting newly created attendance records
-    - run cleanup
+    Controller - called manually via API ("Sync Biometric Data"); the scheduler uses pipeline.run_ingest.
+    Queues one background sync job per device on the long queue (see utils/device_sync):
+    - a device whose previous sync is still queued or running is not queued again
+    - the job fetches the device, creates checkins, advances the sync cursor and clears the device
+    Returns right away; job states and last runs are reported by device_sync.get_device_sync_status.
     """
-    response = {"success": [], "errors": []}
-    devices = frappe.get_all("Biometric Device Settings", fields=["device_ip", "device_port"])
-
-    for device in devices:
-        ip, port = device.device_ip, device.device_port or 4370
-        logs = biometric_sync.fetch_attendance_from_device(ip, port)
-        if logs:
-            new_records = biometric_sync.process_attendance_logs(ip, logs)
-            if new_records:
-                # create_frappe_attendance_multi should return list of created attendance names (adapt if it doesn't)
-                created = checkin_processing.create_frappe_attendance_multi([device])
-                # commit before auto-submit checks
-                frappe.db.commit()
-                # auto submit those created (if eligible)
-                try:
-                    submitted = attendance_processing.auto_submit_new_attendances(created)
-                    response["success"].append(f"Synced {len(new_records)} records from {ip}. Auto-submitted: {len(submitted)}")
-                except Exception as e:
-                    frappe.log_error(f"Auto-submit new attendances error: {e}", "Attendance API")
-                    response["success"].append(f"Synced {len(new_records)} records from {ip}. Auto-submit failed.")
-            else:
-                response["success"].append(f"No new logs for {ip}")
-        else:
-            response["errors"].append(f"Failed to fetch from {ip}")
-
-    cleanup.cleanup_old_attendance_logs()
-    return response
+    queued = pipeline.run_ingest()
+    return {
+        "success": [f"Sync queued for {device}" for device in queued["queued"]],
+        "errors": [f"Sync already running for {device}" for device in queued["running"]],
+        **queued,
+    }
 
 
 @frappe.whitelist()
 def mark_attendance():
-    """Manual button trigger for marking attendance and running auto-submit pass."""
+    """
+    Manual button trigger for the downstream pipeline stages: attendance for the queued
+    (employee, date) pairs, then the auto-submit pass (see utils/pipeline).
+    When another run holds the attendance lock, that run goes once more when it finishes
+    instead of both working on the same Attendance rows.
+    """
     try:
-        created = attendance_processing.process_attendance_realtime()
-        # commit the newly created/updated attendance records
-        frappe.db.commit()
-
-        # Try auto-submitting newly created attendances
-        try:
-            attendance_processing.auto_submit_new_attendances(created)
-        except Exception as e:
-            frappe.log_error(f"Auto-submit after manual mark failed: {e}", "Mark Attendance")
-
-        return {"message": "Attendance marked successfully"}
+        report = pipeline.run_downstream()
+        if report is None:
+            return {"message": "Attendance marking is already running; it will run again when the current run finishes"}
+        if report.error:
+            return {"message": f"Error: {report.error}"}
+        timings = ", ".join(f"{name}: {stage.seconds}s" for name, stage in report.stages.items())
+        return {"message": f"Attendance marked successfully ({timings})", "stages": report.stages}
     except Exception as e:
         frappe.log_error(f"Error marking attendance: {e}", "Mark Attendance")
         return {"message": f"Error: {e}"}
@@ -0,0 +1,8 @@
+// Copyright (c) 2026, Assimilate Technologies and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Attendance Monthly Rollup", {
+// 	refresh(frm) {
+
+// 	},
+// });
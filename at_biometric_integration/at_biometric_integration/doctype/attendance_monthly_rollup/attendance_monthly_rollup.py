@@ -0,0 +1,17 @@
+# Copyright (c) 2026, Assimilate Technologies and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class AttendanceMonthlyRollup(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique(
+		"Attendance Monthly Rollup", ["employee", "month_start"],
+		constraint_name="unique_employee_month_start"
+	)
+	frappe.db.add_index("Attendance Monthly Rollup", ["month_start", "employee"])
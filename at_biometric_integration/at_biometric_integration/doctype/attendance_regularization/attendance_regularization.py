@@ -2,6 +2,9 @@ from frappe.model.document import Document
 import frappe
 from datetime import datetime, time, timedelta
 
+from at_biometric_integration.utils.daily_facts import mark_facts_dirty
+from at_biometric_integration.utils.monthly_rollup import mark_rollups_dirty
+
 class AttendanceRegularization(Document):
     def on_submit(self):
         # Always allow submit, but process only if Approved By HR
@@ -53,6 +56,15 @@ class AttendanceRegularization(Document):
 
         # Create or update Attendance record
         self.create_or_update_attendance(employee_details)
+        self.refresh_reporting()
+
+    def refresh_reporting(self):
+        """
+        The attendance is written with frappe.db.set_value (no doc_events), so refresh the
+        daily facts and monthly rollup the reports read, right before the commit.
+        """
+        mark_facts_dirty([(self.employee, self.date)])
+        mark_rollups_dirty([(self.employee, self.date)])
 
     def create_or_update_checkin(self, employee, time, log_type, company):
         """
@@ -173,6 +185,7 @@ class AttendanceRegularization(Document):
             except Exception as e:
                 frappe.log_error(f"Error deleting Attendance {attendance_name}: {str(e)}")
 
+        self.refresh_reporting()
         frappe.msgprint("Related Employee Checkin and Attendance records deleted successfully.")
     def validate(self):
         # Ensure in_time is before out_time if both are provided
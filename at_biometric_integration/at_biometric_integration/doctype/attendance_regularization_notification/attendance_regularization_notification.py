@@ -0,0 +1,16 @@
+# Copyright (c) 2026, Assimilate Technologies and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class AttendanceRegularizationNotification(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique(
+		"Attendance Regularization Notification", ["employee", "attendance_date"],
+		constraint_name="unique_employee_attendance_date"
+	)
@@ -1,9 +1,15 @@
 # Copyright (c) 2025, Assimilate Technologies and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class AttendanceSettings(Document):
-	pass
+	def on_update(self):
+		# min hours / regularization window feed the auto-submit due time of drafts
+		frappe.enqueue(
+			"at_biometric_integration.utils.attendance_processing.refresh_auto_submit_due_dates",
+			queue="long",
+			enqueue_after_commit=True
+		)
@@ -1,8 +1,10 @@
 import frappe
 from frappe.utils import getdate, nowdate
-from datetime import datetime, timedelta
+from datetime import datetime
 import calendar
 
+from at_biometric_integration.utils.monthly_rollup import get_monthly_summary
+
 def format_number(val):
     if val in [0, 0.0, "0", "00", "0.0", "00.00"]:
         return "-"
@@ -60,25 +62,6 @@ def execute(filters=None):
         if not from_date or not to_date:
             frappe.throw("Please select either a Month or both From Date and To Date")
 
-        att_filters = [from_date, to_date]
-        att_query = """
-            SELECT employee, attendance_date, status, leave_type
-            FROM `tabAttendance`
-            WHERE attendance_date BETWEEN %s AND %s
-        """
-        if filters.get("employee"):
-            att_query += " AND employee = %s"
-            att_filters.append(filters.get("employee"))
-
-        try:
-            attendance = frappe.db.sql(att_query, tuple(att_filters), as_dict=True)
-        except Exception as e:
-            frappe.throw(f"Error fetching attendance data: {e}")
-
-        attendance_map = {}
-        for att in attendance:
-            attendance_map.setdefault(att.employee, {})[att.attendance_date] = att
-
         emp_filters = {"status": "Active"}
         if filters.get("employee"):
             emp_filters["name"] = filters.get("employee")
@@ -87,79 +70,6 @@ def execute(filters=None):
         except Exception as e:
             frappe.throw(f"Error fetching employees: {e}")
 
-        # Earned leave types
-        try:
-            earned_leave_types = [lt.name for lt in frappe.get_all("Leave Type", filters={"is_earned_leave": 1})]
-        except Exception as e:
-            frappe.throw(f"Error fetching leave types: {e}")
-        if not earned_leave_types:
-            earned_leave_types = [""]
-
-        # LOP leave types
-        try:
-            lop_leave_types = [lt.name for lt in frappe.get_all("Leave Type", filters={"is_lwp": 1})]
-        except Exception as e:
-            frappe.throw(f"Error fetching LOP leave types: {e}")
-        if not lop_leave_types:
-            lop_leave_types = [""]
-
-        # Earned leave taken
-        try:
-            leave_applications = frappe.db.sql("""
-                SELECT employee, leave_type, SUM(total_leave_days) as total_leave_days
-                FROM `tabLeave Application`
-                WHERE status = 'Approved'
-                AND leave_type IN %(earned_leave_types)s
-                AND from_date <= %(to_date)s
-                AND to_date >= %(from_date)s
-                GROUP BY employee, leave_type
-            """, {
-                "earned_leave_types": tuple(earned_leave_types),
-                "from_date": from_date,
-                "to_date": to_date
-            }, as_dict=True)
-        except Exception as e:
-            frappe.throw(f"Error fetching leave applications: {e}")
-
-        # LOP leave taken
-        try:
-            lop_leave_applications = frappe.db.sql("""
-                SELECT employee, leave_type, SUM(total_leave_days) as total_leave_days
-                FROM `tabLeave Application`
-                WHERE status = 'Approved'
-                AND leave_type IN %(lop_leave_types)s
-                AND from_date <= %(to_date)s
-                AND to_date >= %(from_date)s
-                GROUP BY employee, leave_type
-            """, {
-                "lop_leave_types": tuple(lop_leave_types),
-                "from_date": from_date,
-                "to_date": to_date
-            }, as_dict=True)
-        except Exception as e:
-            frappe.throw(f"Error fetching LOP leave applications: {e}")
-
-        # Earned leave allocations
-        try:
-            leave_allocations = frappe.db.sql("""
-                SELECT employee, leave_type, SUM(total_leaves_allocated) as total_allocated
-                FROM `tabLeave Allocation`
-                WHERE leave_type IN %(earned_leave_types)s
-                AND from_date <= %(to_date)s
-                AND to_date >= %(from_date)s
-                GROUP BY employee, leave_type
-            """, {
-                "earned_leave_types": tuple(earned_leave_types),
-                "from_date": from_date,
-                "to_date": to_date
-            }, as_dict=True)
-        except Exception as e:
-            frappe.throw(f"Error fetching leave allocations: {e}")
-
-        earned_leave_taken_map = {(la.employee, la.leave_type): la.total_leave_days for la in leave_applications}
-        lop_leave_taken_map = {(la.employee, la.leave_type): la.total_leave_days for la in lop_leave_applications}
-        leave_allocation_map = {(alloc.employee, alloc.leave_type): alloc.total_allocated for alloc in leave_allocations}
-
         totals = {
             "employee": "Total",
             "present": 0, "leave": 0, "absent": 0,
@@ -172,85 +82,13 @@ def execute(filters=None):
             "lop": 0,
         }
 
-        all_dates = [from_date + timedelta(days=i) for i in range((to_date - from_date).days + 1)]
-
-        for emp in employees:
-            emp_attendance = attendance_map.get(emp.name, {})
-            weekend_dates = set(d for d in all_dates if d.weekday() in [5, 6])
-
-            holiday_dates = set()
-            if emp.holiday_list:
-                try:
-                    holidays = frappe.get_all("Holiday", fields=["holiday_date"], filters={
-                        "parent": emp.holiday_list,
-                        "holiday_date": ["between", [from_date, to_date]]
-                    })
-                    holiday_dates = set(h.holiday_date for h in holidays)
-                except Exception as e:
-                    frappe.throw(f"Error fetching holidays for {emp.name}: {e}")
-
-            final_holidays = holiday_dates - weekend_dates
-            valid_working_days = set(all_dates) - weekend_dates - final_holidays
-
-            present = leave = absent = half_day = wfh = lop = 0
-
-            for date in all_dates:
-                record = emp_attendance.get(date)
-                if date in valid_working_days:
-                    if record:
-                        status = record.status
-                        leave_type = record.leave_type
-                        if status == "Present":
-                            present += 1
-                        elif status == "On Leave":
-                            if leave_type in lop_leave_types:
-                                lop += 1
-                            else:
-                                leave += 1
-                        elif status == "Half Day":
-                            half_day += 1
-                        elif status == "Work From Home":
-                            wfh += 1
-                        elif status == "Absent":
-                            absent += 1
-                    else:
-                        absent += 1
-
-            earned_leave_taken = sum(
-                v for (ename, _), v in earned_leave_taken_map.items() if ename == emp.name
-            )
-            total_allocated = sum(
-                v for (ename, _), v in leave_allocation_map.items() if ename == emp.name
-            )
-            earned_leave_balance = total_allocated - earned_leave_taken
-
-            lop_leave_taken = sum(
-                v for (ename, _), v in lop_leave_taken_map.items() if ename == emp.name
-            )
-
-            row = {
-                "employee": emp.name,
-                "employee_name": emp.employee_name,
-                "present": present,
-                "leave": leave,
-                "lop": lop + lop_leave_taken,  # Add LOP from attendance and leave applications
-                "absent": absent,
-                "half_day": half_day,
-                "wfh": wfh,
-                "no_of_weekends": len(weekend_dates),
-                "no_of_holidays": len(final_holidays),
-                "total_absent": absent + leave + (half_day / 2) + lop + lop_leave_taken,
-                "total_working_days": present + (half_day / 2),
-                "payment_days": leave + len(final_holidays) + len(weekend_dates) + absent + present + (half_day / 2) + wfh,
-                "earned_leave_taken": earned_leave_taken,
-                "earned_leave_balance": earned_leave_balance,
-            }
-
+        # closed months come from Attendance Monthly Rollup, anything else is computed live
+        for row in get_monthly_summary(employees, from_date, to_date):
             for key in totals:
                 if key != "employee":
                     totals[key] += row.get(key, 0)
 
-            if present + leave + absent + half_day + wfh + lop > 0:
+            if row.has_attendance:
                 formatted_row = {}
                 for col in columns:
                     fname = col["fieldname"]
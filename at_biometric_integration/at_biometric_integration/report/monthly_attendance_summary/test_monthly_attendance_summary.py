@@ -0,0 +1,92 @@
+# Copyright (c) 2026, Assimilate Technologies and Contributors
+# See license.txt
+
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from at_biometric_integration.at_biometric_integration.report.monthly_attendance_summary.monthly_attendance_summary import (
+	execute,
+)
+
+FROM_DATE = date(2026, 3, 1)
+TO_DATE = date(2026, 3, 31)
+HOLIDAY_LISTS = ["HL-A", "HL-B", "HL-C"]
+# per-employee cost at 10,000 employees may be at most this many times the cost at 100
+LINEAR_TOLERANCE = 4
+
+
+def make_dataset(employee_count):
+	"""Synthetic month of data for `employee_count` employees, shaped like the report's queries."""
+	employees = [
+		frappe._dict(name=f"EMP-{i:05d}", employee_name=f"Employee {i}", holiday_list=HOLIDAY_LISTS[i % 3])
+		for i in range(employee_count)
+	]
+	days = [FROM_DATE + timedelta(days=i) for i in range((TO_DATE - FROM_DATE).days + 1)]
+	statuses = ["Present", "Present", "Present", "Half Day", "On Leave", "Work From Home", "Absent"]
+
+	attendance = [
+		frappe._dict(
+			employee=emp.name, attendance_date=day, status=statuses[(i + day.day) % len(statuses)],
+			leave_type="Privilege Leave" if statuses[(i + day.day) % len(statuses)] == "On Leave" else None,
+		)
+		for i, emp in enumerate(employees)
+		for day in days
+		if day.weekday() < 5
+	]
+	leave_totals = [frappe._dict(employee=emp.name, total_leave_days=2.0) for emp in employees[::2]]
+	allocations = [frappe._dict(employee=emp.name, total_allocated=18.0) for emp in employees]
+	holidays = [frappe._dict(parent=hl, holiday_date=date(2026, 3, 10 + i)) for i, hl in enumerate(HOLIDAY_LISTS)]
+
+	def sql(query, values=None, as_dict=False, **kwargs):
+		if "tabLeave Allocation" in query:
+			return allocations
+		if "tabLeave Application" in query:
+			return leave_totals
+		return attendance
+
+	def get_all(doctype, fields=None, filters=None, **kwargs):
+		if doctype == "Employee":
+			return employees
+		if doctype == "Leave Type":
+			return [frappe._dict(name="Privilege Leave" if "is_earned_leave" in filters else "Leave Without Pay")]
+		if doctype == "Holiday":
+			return holidays
+		return []
+
+	return sql, get_all
+
+
+def run_report(employee_count, repeat):
+	sql, get_all = make_dataset(employee_count)
+	filters = {"from_date": FROM_DATE, "to_date": TO_DATE}
+	best = None
+	with patch.object(frappe.db, "sql", side_effect=sql), patch.object(frappe, "get_all", side_effect=get_all):
+		for _ in range(repeat):
+			started = time.perf_counter()
+			_, data = execute(filters)
+			elapsed = time.perf_counter() - started
+			best = elapsed if best is None else min(best, elapsed)
+	return best, data
+
+
+class TestMonthlyAttendanceSummary(FrappeTestCase):
+	def test_one_row_per_employee_plus_total(self):
+		_, data = run_report(100, repeat=1)
+		self.assertEqual(len(data), 101)
+		self.assertEqual(data[-1]["employee"], "Total")
+
+	def test_scales_linearly_with_headcount(self):
+		small, _ = run_report(100, repeat=5)
+		large, _ = run_report(10_000, repeat=2)
+
+		per_employee_small = small / 100
+		per_employee_large = large / 10_000
+		self.assertLess(
+			per_employee_large, per_employee_small * LINEAR_TOLERANCE,
+			f"100 employees: {small:.3f}s, 10,000 employees: {large:.3f}s - per-employee cost grew "
+			f"{per_employee_large / per_employee_small:.1f}x",
+		)
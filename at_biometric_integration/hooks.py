@@ -94,7 +94,10 @@ doctype_list_js = {
 # ------------
 
 # before_install = "at_biometric_integration.install.before_install"
-# after_install = "at_biometric_integration.install.after_install"
+after_install = [
+    "at_biometric_integration.patches.add_employee_checkin_indexes.execute",
+    "at_biometric_integration.patches.add_attendance_auto_submit_due_at.execute"
+]
 
 # Uninstallation
 # ------------
@@ -155,6 +158,56 @@ doctype_list_js = {
 # 		"on_trash": "method"
 # 	}
 # }
+doc_events = {
+    "Attendance": {
+        "validate": "at_biometric_integration.utils.attendance_processing.set_auto_submit_due_at",
+        "on_update": "at_biometric_integration.utils.daily_facts.mark_attendance_fact_dirty",
+        "on_submit": [
+            "at_biometric_integration.utils.daily_facts.mark_attendance_fact_dirty",
+            "at_biometric_integration.utils.monthly_rollup.mark_rollup_dirty"
+        ],
+        "on_update_after_submit": [
+            "at_biometric_integration.utils.daily_facts.mark_attendance_fact_dirty",
+            "at_biometric_integration.utils.monthly_rollup.mark_rollup_dirty"
+        ],
+        "on_cancel": [
+            "at_biometric_integration.utils.daily_facts.mark_attendance_fact_dirty",
+            "at_biometric_integration.utils.monthly_rollup.mark_rollup_dirty"
+        ],
+        "on_trash": "at_biometric_integration.utils.daily_facts.mark_attendance_fact_dirty"
+    },
+    "Leave Application": {
+        "on_update": "at_biometric_integration.utils.monthly_rollup.mark_rollup_dirty",
+        "on_cancel": "at_biometric_integration.utils.monthly_rollup.mark_rollup_dirty"
+    },
+    "Leave Allocation": {
+        "on_submit": "at_biometric_integration.utils.monthly_rollup.mark_rollup_dirty",
+        "on_update_after_submit": "at_biometric_integration.utils.monthly_rollup.mark_rollup_dirty",
+        "on_cancel": "at_biometric_integration.utils.monthly_rollup.mark_rollup_dirty"
+    },
+    "Employee Checkin": {
+        "after_insert": "at_biometric_integration.utils.attendance_processing.mark_checkin_dirty",
+        "on_trash": "at_biometric_integration.utils.attendance_processing.mark_checkin_dirty"
+    },
+    "Shift Type": {
+        "on_update": "at_biometric_integration.utils.shift_cache.clear_shift_type_cache",
+        "on_trash": "at_biometric_integration.utils.shift_cache.clear_shift_type_cache"
+    },
+    "Employee": {
+        "on_update": "at_biometric_integration.utils.shift_cache.clear_employee_profile_cache",
+        "on_trash": "at_biometric_integration.utils.shift_cache.clear_employee_profile_cache"
+    },
+    "Holiday List": {
+        "on_update": [
+            "at_biometric_integration.utils.business_time.clear_business_calendar_cache",
+            "at_biometric_integration.utils.monthly_rollup.refresh_holiday_list_rollups"
+        ],
+        "on_trash": [
+            "at_biometric_integration.utils.business_time.clear_business_calendar_cache",
+            "at_biometric_integration.utils.monthly_rollup.refresh_holiday_list_rollups"
+        ]
+    }
+}
 
 # Scheduled Tasks
 # ---------------
@@ -257,22 +310,23 @@ scheduler_events = {
 
     "cron": {
         "*/15 * * * *": [
-            "at_biometric_integration.api.fetch_and_upload_attendance"
+            "at_biometric_integration.utils.pipeline.run_ingest"
+        ],
+        "*/30 * * * *": [
+            "at_biometric_integration.utils.pipeline.run_downstream"
         ]
     },
 
     "hourly": [
-        "at_biometric_integration.api.mark_attendance"
+        "at_biometric_integration.utils.regularization.notify_regularization_eligibility"
     ],
 
-    "cron": {
-        "*/30 * * * *": [
-            "at_biometric_integration.attendance_processing.auto_submit_due_attendances"
-        ]
-    },
-    
     "daily": [
         "at_biometric_integration.utils.cleanup.cleanup_old_attendance_logs"
+    ],
+
+    "monthly": [
+        "at_biometric_integration.utils.monthly_rollup.build_closed_month_rollups"
     ]
 }
 
@@ -302,5 +356,10 @@ fixtures = [
     # }
     
 ]
-after_migrate = ["at_biometric_integration.patches.workflow_state_action.execute","at_biometric_integration.patches.create_biometric_roles_and_permissions.execute"]
+after_migrate = [
+    "at_biometric_integration.patches.workflow_state_action.execute",
+    "at_biometric_integration.patches.create_biometric_roles_and_permissions.execute",
+    "at_biometric_integration.patches.add_employee_checkin_indexes.execute",
+    "at_biometric_integration.patches.add_attendance_auto_submit_due_at.execute"
+]
 
@@ -0,0 +1,25 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+def execute():
+    """
+    Add Attendance.auto_submit_due_at, the time from which a draft may be auto-submitted,
+    index it with docstatus for the auto-submit scheduler and fill it for existing drafts.
+    """
+    create_custom_fields({
+        "Attendance": [{
+            "fieldname": "auto_submit_due_at",
+            "label": "Auto Submit Due At",
+            "fieldtype": "Datetime",
+            "insert_after": "working_hours",
+            "read_only": 1,
+            "no_copy": 1,
+            "print_hide": 1
+        }]
+    }, update=True)
+
+    frappe.db.add_index("Attendance", ["docstatus", "auto_submit_due_at"], index_name="docstatus_auto_submit_due_at_index")
+    frappe.db.commit()
+
+    from at_biometric_integration.utils.attendance_processing import refresh_auto_submit_due_dates
+    refresh_auto_submit_due_dates()
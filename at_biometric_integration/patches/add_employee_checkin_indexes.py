@@ -0,0 +1,39 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+UNIQUE_KEY = "unique_employee_time_device_ip"
+
+def execute():
+    """
+    Index Employee Checkin for the biometric ingest (runs after every migrate, a no-op once done):
+    - Employee Checkin.device_ip, the device a punch was read from (device_id holds the
+      employee's enrolment id on that device)
+    - (employee, time) for the per-employee time window dedup lookups
+    - unique (employee, time, device_ip) so re-ingesting the same device punch is a no-op at DB level.
+      NULLs are distinct in a unique key, so checkins without a device (file imports, manual
+      entries) are not covered by it; those rely on the existing-checkin lookup.
+    """
+    if not frappe.get_meta("Employee Checkin").has_field("device_ip"):
+        create_custom_fields({
+            "Employee Checkin": [{
+                "fieldname": "device_ip",
+                "label": "Device IP",
+                "fieldtype": "Data",
+                "insert_after": "device_id",
+                "read_only": 1,
+                "no_copy": 1,
+                "print_hide": 1
+            }]
+        })
+
+    frappe.db.add_index("Employee Checkin", ["employee", "time"], index_name="employee_time_index")
+
+    if frappe.db.has_index("tabEmployee Checkin", UNIQUE_KEY):
+        return
+    try:
+        frappe.db.add_unique("Employee Checkin", ["employee", "time", "device_ip"], constraint_name=UNIQUE_KEY)
+    except Exception as e:
+        # existing duplicate rows block the constraint; dedup still works through the lookup
+        frappe.logger().warning(f"Could not add unique (employee, time, device_ip) on Employee Checkin: {e}")
+
+    frappe.db.commit()
@@ -0,0 +1,13 @@
+import frappe
+
+def execute():
+    """
+    Fill Attendance Daily Fact for existing attendance and checkins.
+    Runs as a background job on the long queue so the migration itself stays fast.
+    """
+    frappe.enqueue(
+        "at_biometric_integration.utils.daily_facts.rebuild_all_daily_facts",
+        queue="long",
+        timeout=6 * 3600,
+        enqueue_after_commit=True
+    )
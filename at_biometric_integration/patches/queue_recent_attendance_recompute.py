@@ -0,0 +1,18 @@
+import frappe
+from frappe.utils import add_months, get_first_day, nowdate
+
+def execute():
+    """
+    Queue the (employee, date) pairs of recent checkins in Attendance Recompute Queue, so the
+    pipeline rebuilds their attendance once after the upgrade (checkins ingested before the
+    queue existed were never queued). Covers the previous and the current month.
+    """
+    from at_biometric_integration.utils.attendance_processing import mark_attendance_dirty
+
+    pairs = frappe.db.sql("""
+        SELECT DISTINCT employee, DATE(time)
+        FROM `tabEmployee Checkin`
+        WHERE time >= %s AND employee IS NOT NULL
+    """, (add_months(get_first_day(nowdate()), -1),))
+    mark_attendance_dirty(pairs)
+    frappe.db.commit()
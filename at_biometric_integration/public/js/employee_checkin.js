@@ -22,7 +22,7 @@ frappe.listview_settings['Employee Checkin'] = {
 
             // ------------------ SYNC BIOMETRIC DATA ------------------
             listview.page.add_inner_button(__('Sync Biometric Data'), () => {
-                show_progress_msg('Syncing biometric data in background...');
+                show_progress_msg('Queueing device syncs...');
 
                 frappe.call({
                     method: "at_biometric_integration.api.fetch_and_upload_attendance",
@@ -39,6 +39,16 @@ frappe.listview_settings['Employee Checkin'] = {
                 });
             }, "Tools");
 
+            // ------------------ DEVICE SYNC STATUS ------------------
+            listview.page.add_inner_button(__('Device Sync Status'), () => {
+                frappe.call({
+                    method: "at_biometric_integration.utils.device_sync.get_device_sync_status",
+                    callback: function (r) {
+                        if (r.message) show_device_sync_status(r.message);
+                    }
+                });
+            }, "Tools");
+
             // ------------------ MARK ATTENDANCE ------------------
             listview.page.add_inner_button(__('Mark Attendance'), () => {
                 show_progress_msg('Marking attendance from check-ins...');
@@ -59,35 +69,15 @@ frappe.listview_settings['Employee Checkin'] = {
             }, "Tools");
 
             // ------------------ IMPORT CHECKINS ------------------
-            listview.page.add_inner_button('Import Checkins', () => {
-                const $input = $('<input type="file" accept=".csv,.xls,.xlsx" style="display:none">');
-                $('body').append($input);
-
-                $input.on('change', function (e) {
-                    const file = e.target.files[0];
-                    if (!file) return;
-
-                    const ext = file.name.split('.').pop().toLowerCase();
-                    const reader = new FileReader();
-
-                    if (['xls', 'xlsx'].includes(ext)) {
-                        reader.onload = function (e) {
-                            const data = new Uint8Array(e.target.result);
-                            const workbook = XLSX.read(data, { type: 'array' });
-                            const sheet = workbook.Sheets[workbook.SheetNames[0]];
-                            const csvData = XLSX.utils.sheet_to_csv(sheet);
-                            parseCSVAndImport(csvData);
-                        };
-                        reader.readAsArrayBuffer(file);
-                    } else {
-                        reader.onload = function (e) {
-                            parseCSVAndImport(e.target.result);
-                        };
-                        reader.readAsText(file);
+            listview.page.add_inner_button(__('Import Checkins'), () => {
+                new frappe.ui.FileUploader({
+                    doctype: 'Employee Checkin',
+                    restrictions: { allowed_file_types: ['.csv', '.txt', '.xlsx', '.xls', '.dat'] },
+                    make_attachments_public: false,
+                    on_success(file_doc) {
+                        start_checkin_import(file_doc.file_url, listview);
                     }
                 });
-
-                $input.click();
             }, "Tools");
         });
     }
@@ -121,99 +111,72 @@ function show_result_message(data) {
     frappe.msgprint(__(msg || 'No updates found.'));
 }
 
+function show_device_sync_status(devices) {
+    if (!devices.length) {
+        frappe.msgprint(__('No biometric devices configured.'));
+        return;
+    }
+    const rows = devices.map(d => {
+        const last = d.last_run || {};
+        return `<tr>
+            <td>${frappe.utils.escape_html(d.device)}<br><small class="text-muted">${d.ip || ''}</small></td>
+            <td>${d.job_status || '-'}</td>
+            <td>${last.finished_at ? frappe.datetime.comment_when(last.finished_at) : '-'}</td>
+            <td>${frappe.utils.escape_html(last.message || '')}</td>
+        </tr>`;
+    }).join('');
+    frappe.msgprint({
+        title: __('Device Sync Status'),
+        message: `<table class="table table-bordered">
+            <thead><tr><th>${__('Device')}</th><th>${__('Job')}</th><th>${__('Last Run')}</th><th>${__('Result')}</th></tr></thead>
+            <tbody>${rows}</tbody>
+        </table>`,
+        wide: true
+    });
+}
+
 // ======================================================================
-// CSV / XLSX IMPORT FUNCTIONALITY
+// CSV / XLSX / ZK .dat IMPORT (parsed and inserted server side in a background job)
 // ======================================================================
 
-function parseCSVAndImport(csvText) {
+function start_checkin_import(file_url, listview) {
     frappe.confirm(
         'This will import Employee Checkins from the selected file. Continue?',
         () => {
-            const rows = csvText.split(/\r?\n/).map(r => r.trim()).filter(r => r);
-            const headerIdx = rows.findIndex(r => r.startsWith('No'));
-            if (headerIdx === -1) {
-                frappe.msgprint('❌ Could not find header row (must start with "No.")');
-                return;
-            }
-
-            const tableRows = rows.slice(headerIdx);
-            const dataRows = tableRows.map(r => r.split(/[\t,]+/));
-            const headers = dataRows.shift().map(h => h.trim());
-
-            const dateIdx = headers.indexOf('Date');
-            const timeIdx = headers.indexOf('Time');
-            const empIdIdx = headers.indexOf('Employee ID');
-            const punchIdx = headers.indexOf('Punch State');
-
-            if ([dateIdx, timeIdx, empIdIdx, punchIdx].includes(-1)) {
-                frappe.msgprint('❌ Missing required columns: Date, Time, Employee ID, Punch State');
-                return;
-            }
-
-            frappe.show_progress('Importing Checkins...', 0, dataRows.length, 'Processing records');
-            let count = 0;
-
-            const processRow = (i) => {
-                if (i >= dataRows.length) {
-                    frappe.hide_progress();
-                    frappe.msgprint(`✅ Import completed. ${count} check-ins created.`);
-                    return;
-                }
-
-                const r = dataRows[i].map(v => v.trim());
-                const deviceId = r[empIdIdx];
-                const date = r[dateIdx];
-                const time = r[timeIdx];
-                const punch = r[punchIdx];
-
-                if (!deviceId || !date || !time) return processRow(i + 1);
-
-                frappe.db.get_value('Employee', { attendance_device_id: deviceId }, 'name')
-                    .then(emp => {
-                        if (!emp || !emp.message || !emp.message.name) {
-                            console.warn(`⚠️ Employee not found for device ID: ${deviceId}`);
-                            return processRow(i + 1);
+            frappe.call({
+                method: 'at_biometric_integration.utils.checkin_import.import_checkins',
+                args: { file_url: file_url },
+                callback: function (r) {
+                    if (!r.message) return;
+                    const import_id = r.message.import_id;
+                    frappe.show_progress(__('Importing Checkins...'), 0, 100, __('Queued'));
+
+                    const on_progress = (data) => {
+                        if (data.import_id !== import_id) return;
+                        const counts = __('{0} rows read, {1} check-ins created', [data.rows, data.created]);
+
+                        if (data.status === 'Running') {
+                            frappe.show_progress(__('Importing Checkins...'), data.progress, 100, counts);
+                            return;
                         }
 
-                        let formattedDatetime;
-                        try {
-                            const [day, month, year] = date.split('-');
-                            formattedDatetime = `${year}-${month}-${day} ${time}`;
-                        } catch {
-                            console.error('⚠️ Invalid date format:', date);
-                            return processRow(i + 1);
+                        frappe.realtime.off('checkin_import_progress', on_progress);
+                        frappe.hide_progress();
+                        if (data.status === 'Completed') {
+                            frappe.msgprint(
+                                `✅ Import completed. ${data.created} check-ins created, ${data.skipped} already existed.`
+                                + (data.unmatched ? `<br>⚠️ ${data.unmatched} rows with an unknown Employee ID.` : '')
+                                + (data.invalid ? `<br>⚠️ ${data.invalid} rows with a missing or invalid date/time.` : '')
+                                + (data.failed ? `<br>❌ ${data.failed} rows failed, see the Error Log.` : '')
+                            );
+                            listview.refresh();
+                        } else {
+                            frappe.msgprint(__('❌ Import failed: {0}', [data.error || '']));
                         }
-
-                        frappe.call({
-                            method: 'frappe.client.insert',
-                            args: {
-                                doc: {
-                                    doctype: 'Employee Checkin',
-                                    employee: emp.message.name,
-                                    time: formattedDatetime,
-                                    log_type: punch == '255' ? 'IN' : 'OUT',
-                                    device_id: deviceId,
-                                    latitude: "0.0",
-                                    longitude: "0.0",
-                                    skip_auto_attendance: 0
-                                }
-                            },
-                            callback: function (r) {
-                                if (!r.exc) count++;
-                                frappe.show_progress('Importing Checkins...', i + 1, dataRows.length);
-                                processRow(i + 1);
-                            },
-                            error: function (err) {
-                                console.error('Insert error:', err);
-                                processRow(i + 1);
-                            }
-                        });
-                    });
-            };
-            processRow(0);
+                    };
+                    frappe.realtime.on('checkin_import_progress', on_progress);
+                }
+            });
         }
     );
 }
-
-// Load XLSX library for Excel parsing
-frappe.require('https://cdnjs.cloudflare.com/ajax/libs/xlsx/0.18.5/xlsx.full.min.js');
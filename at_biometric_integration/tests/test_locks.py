@@ -0,0 +1,225 @@
+# Copyright (c) 2026, Assimilate Technologies and Contributors
+# See license.txt
+
+import threading
+import time
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from at_biometric_integration.utils import locks
+
+LOCK = "test_lock"
+
+
+class FakeRedis:
+	"""The part of redis-py the locks use, in memory, with a clock the tests move by hand."""
+
+	def __init__(self):
+		self.values = {}
+		self.expiry = {}
+		self.now = 0.0
+		self.before_eval = None
+		self.mutex = threading.Lock()
+
+	def _alive(self, key):
+		if key in self.expiry and self.expiry[key] <= self.now:
+			self.values.pop(key, None)
+			self.expiry.pop(key, None)
+		return key in self.values
+
+	def set(self, key, value, nx=False, ex=None):
+		with self.mutex:
+			if nx and self._alive(key):
+				return None
+			self.values[key] = str(value).encode()
+			self.expiry.pop(key, None)
+			if ex:
+				self.expiry[key] = self.now + ex
+			return True
+
+	def get(self, key):
+		with self.mutex:
+			return self.values.get(key) if self._alive(key) else None
+
+	def exists(self, key):
+		with self.mutex:
+			return int(self._alive(key))
+
+	def delete(self, *keys):
+		with self.mutex:
+			return self._delete(*keys)
+
+	def _delete(self, *keys):
+		deleted = 0
+		for key in keys:
+			self.expiry.pop(key, None)
+			deleted += self.values.pop(key, None) is not None
+		return deleted
+
+	def ttl(self, key):
+		with self.mutex:
+			return int(self.expiry[key] - self.now) if self._alive(key) and key in self.expiry else -1
+
+	def eval(self, script, numkeys, key, token, *args):
+		if self.before_eval:
+			self.before_eval(script)
+		with self.mutex:
+			if not self._alive(key) or self.values[key] != str(token).encode():
+				return 0
+			if script == locks._RELEASE:
+				return self._delete(key)
+			self.expiry[key] = self.now + int(args[0]) / 1000
+			return 1
+
+	def sadd(self, key, *members):
+		self.values.setdefault(key, set()).update(members)
+
+	def smembers(self, key):
+		return set(self.values.get(key, ()))
+
+	def hincrby(self, key, field, by=1):
+		values = self.values.setdefault(key, {})
+		values[field] = int(values.get(field, 0)) + by
+		return values[field]
+
+	def hset(self, key, field=None, value=None, mapping=None):
+		values = self.values.setdefault(key, {})
+		values.update(mapping or {})
+		if field is not None:
+			values[field] = value
+
+	def hgetall(self, key):
+		return dict(self.values.get(key, {}))
+
+
+class FakeCache:
+	connection_pool = None
+
+	def make_key(self, key):
+		return f"test|{key}"
+
+
+class TestLocks(FrappeTestCase):
+	def setUp(self):
+		self.redis = FakeRedis()
+		self.cache = FakeCache()
+		for patcher in (
+			patch.object(locks.redis, "Redis", return_value=self.redis),
+			patch.object(frappe, "cache", return_value=self.cache),
+		):
+			patcher.start()
+			self.addCleanup(patcher.stop)
+		frappe.local.at_biometric_locks = {}
+		self.lock_key = self.cache.make_key(locks.LOCK_KEY.format(LOCK))
+		self.rerun_key = self.cache.make_key(locks.RERUN_KEY.format(LOCK))
+
+	def test_lock_is_exclusive_until_released(self):
+		first = locks.NamedLock(LOCK)
+		self.assertTrue(first.acquire())
+
+		# another process: nothing held in its frappe.local
+		frappe.local.at_biometric_locks = {}
+		second = locks.NamedLock(LOCK)
+		self.assertFalse(second.acquire())
+
+		frappe.local.at_biometric_locks = {LOCK: 1}
+		first.release()
+		self.assertFalse(self.redis.exists(self.lock_key))
+		self.assertTrue(second.acquire())
+		second.release()
+
+	def test_release_keeps_a_lock_taken_over_by_another_holder(self):
+		lock = locks.NamedLock(LOCK, ttl=10)
+		lock.acquire()
+		# the TTL ran out and another worker took the lock
+		self.redis.now += 11
+		self.redis.set(self.lock_key, "other-worker", nx=True, ex=10)
+
+		lock.release()
+		self.assertTrue(lock.lost)
+		self.assertEqual(self.redis.get(self.lock_key), b"other-worker")
+
+	def test_heartbeat_keeps_the_lock_past_its_ttl(self):
+		with locks.NamedLock(LOCK, ttl=3) as lock:
+			# the heartbeat beats every second (TTL / 3) of real time
+			time.sleep(1.3)
+			self.redis.now += 2.5
+			time.sleep(1.0)
+			self.redis.now += 2.5
+			# 5 seconds on the lock's clock, past the 3 second TTL
+			self.assertEqual(self.redis.get(self.lock_key), lock.token.encode())
+			self.assertFalse(lock.lost)
+		self.assertFalse(self.redis.exists(self.lock_key))
+
+	def test_heartbeat_notices_a_lost_lock(self):
+		with locks.NamedLock(LOCK, ttl=3) as lock:
+			self.redis.delete(self.lock_key)
+			time.sleep(1.3)
+			self.assertTrue(lock.lost)
+
+	def test_run_exclusive_is_reentrant(self):
+		def inner():
+			self.assertEqual(frappe.local.at_biometric_locks[LOCK], 2)
+			return "inner"
+
+		def outer():
+			token = self.redis.get(self.lock_key)
+			nested = locks.run_exclusive(LOCK, inner)
+			# the nested run neither took a new lock nor released the outer one
+			self.assertEqual(self.redis.get(self.lock_key), token)
+			return nested
+
+		outcome = locks.run_exclusive(LOCK, outer)
+		self.assertTrue(outcome.ran)
+		self.assertTrue(outcome.result.ran)
+		self.assertEqual(outcome.result.result, "inner")
+		self.assertFalse(self.redis.exists(self.lock_key))
+		self.assertEqual(frappe.local.at_biometric_locks, {})
+
+	def test_run_exclusive_skips_and_coalesces_while_held(self):
+		self.redis.set(self.lock_key, "other-worker", nx=True, ex=300)
+		calls = []
+
+		skipped = locks.run_exclusive(LOCK, calls.append, 1)
+		self.assertFalse(skipped.ran)
+		self.assertFalse(skipped.coalesced)
+		self.assertFalse(self.redis.exists(self.rerun_key))
+
+		coalesced = locks.run_exclusive(LOCK, calls.append, 1, coalesce=True)
+		self.assertFalse(coalesced.ran)
+		self.assertTrue(coalesced.coalesced)
+		self.assertTrue(self.redis.exists(self.rerun_key))
+		self.assertEqual(calls, [])
+
+	def test_coalesced_request_runs_once_more(self):
+		calls = []
+
+		def run():
+			calls.append(1)
+			if len(calls) == 1:
+				# a skipped run asks the holder to go again
+				locks.request_rerun(LOCK)
+
+		outcome = locks.run_exclusive(LOCK, run, coalesce=True)
+		self.assertTrue(outcome.ran)
+		self.assertEqual(len(calls), 2)
+		self.assertFalse(self.redis.exists(self.rerun_key))
+
+	def test_request_made_while_releasing_is_not_lost(self):
+		calls = []
+		requested = []
+
+		def request_before_release(script):
+			# a skipped run requests a rerun after the holder's last check, before its release
+			if script == locks._RELEASE and not requested:
+				requested.append(1)
+				self.redis.set(self.rerun_key, 1, ex=300)
+
+		self.redis.before_eval = request_before_release
+		outcome = locks.run_exclusive(LOCK, calls.append, 1, coalesce=True)
+		self.assertTrue(outcome.ran)
+		self.assertEqual(len(calls), 2)
+		self.assertFalse(self.redis.exists(self.rerun_key))
+		self.assertFalse(self.redis.exists(self.lock_key))
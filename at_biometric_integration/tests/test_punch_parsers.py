@@ -0,0 +1,108 @@
+# Copyright (c) 2026, Assimilate Technologies and Contributors
+# See license.txt
+
+import os
+import tempfile
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from at_biometric_integration.utils.punch_parsers import (
+	PUNCH_IN,
+	PUNCH_OUT,
+	_iter_attlog,
+	_iter_export,
+	iter_punch_chunks,
+	parse_punch_time,
+)
+
+EXPORT_HEADER = ["No.", "Date", "Time", "Employee ID", "Punch State"]
+
+
+def export_rows(rows):
+	"""Rows in the (values, progress) shape of the CSV / XLSX readers."""
+	return [(values, 0.0) for values in rows]
+
+
+class TestPunchParsers(FrappeTestCase):
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.dir = tmp.name
+
+	def write(self, name, text):
+		path = os.path.join(self.dir, name)
+		with open(path, "w", encoding="utf-8") as f:
+			f.write(text)
+		return path
+
+	def test_parse_punch_time(self):
+		self.assertEqual(parse_punch_time("05-03-2026", "09:15:30"), "2026-03-05 09:15:30")
+		self.assertEqual(parse_punch_time("05-03-2026", "09:15"), "2026-03-05 09:15:00")
+		self.assertEqual(parse_punch_time("2026-03-05", "18:02:00"), "2026-03-05 18:02:00")
+		self.assertIsNone(parse_punch_time("", "09:15"))
+		self.assertIsNone(parse_punch_time("05-03-2026", None))
+		self.assertIsNone(parse_punch_time("2026/03/05", "09:15"))
+
+	def test_export_rows_are_normalized(self):
+		stats = {}
+		records = [record for record, _ in _iter_export(export_rows([
+			["Attendance Record Report"],
+			EXPORT_HEADER,
+			["1", "05-03-2026", "09:15:30", "17", "255"],
+			["2", "05-03-2026", "18:02", "17", "1"],
+			[],
+			["3", "not a date", "18:02", "17", "1"],
+			["4", "05-03-2026", "18:05", "", "1"],
+		]), stats)]
+
+		self.assertEqual(records, [
+			{"user_id": "17", "timestamp": "2026-03-05 09:15:30", "punch": PUNCH_IN, "status": None},
+			{"user_id": "17", "timestamp": "2026-03-05 18:02:00", "punch": PUNCH_OUT, "status": None},
+		])
+		self.assertEqual(stats["invalid"], 2)
+
+	def test_export_requires_its_columns(self):
+		with self.assertRaises(frappe.ValidationError):
+			list(_iter_export(export_rows([["No.", "Date", "Employee ID"]]), None))
+		with self.assertRaises(frappe.ValidationError):
+			list(_iter_export(export_rows([["1", "05-03-2026", "09:15", "17", "255"]]), None))
+
+	def test_csv_export_is_read_in_chunks(self):
+		path = self.write("export.csv", "\n".join([
+			"\t".join(EXPORT_HEADER),
+			"1\t05-03-2026\t09:00:00\t17\t255",
+			"2,05-03-2026,09:05:00,18,255",
+			"3\t05-03-2026\t18:00:00\t17\t1",
+		]) + "\n")
+
+		chunks = list(iter_punch_chunks(path, chunk_size=2))
+		self.assertEqual([len(records) for records, _ in chunks], [2, 1])
+		self.assertEqual([r["user_id"] for records, _ in chunks for r in records], ["17", "18", "17"])
+		self.assertEqual(chunks[-1][1], 100.0)
+
+	def test_attlog_lines(self):
+		stats = {}
+		path = self.write("attlog.dat", "\n".join([
+			"  17\t2026-03-05 09:15:30\t1\t0\t0\t0",
+			"",
+			"18\t2026-03-05 18:02:00\t15\t1\t0\t0",
+			"19 2026-03-05 18:10:00 1 1 0 0",
+			"20\t2026-03-05 18:20:00",
+			"21\t05-03-2026 18:30:00\t1\t1",
+			"garbage",
+		]) + "\n")
+
+		records = [record for record, _ in _iter_attlog(path, stats)]
+		self.assertEqual(records, [
+			{"user_id": "17", "timestamp": "2026-03-05 09:15:30", "punch": 0, "status": 1},
+			{"user_id": "18", "timestamp": "2026-03-05 18:02:00", "punch": 1, "status": 15},
+			{"user_id": "19", "timestamp": "2026-03-05 18:10:00", "punch": 1, "status": 1},
+			{"user_id": "20", "timestamp": "2026-03-05 18:20:00", "punch": PUNCH_IN, "status": None},
+		])
+		self.assertEqual(stats["invalid"], 2)
+
+	def test_unsupported_extension(self):
+		path = self.write("export.pdf", "")
+		with self.assertRaises(frappe.ValidationError):
+			list(iter_punch_chunks(path))
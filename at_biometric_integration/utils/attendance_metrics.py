@@ -0,0 +1,122 @@
+"""
+Columnar early/late/overtime engine shared by the attendance reports and their exports.
+Times are converted once to seconds since midnight (MISSING when unknown) and every
+metric is computed with NumPy over the whole result set instead of row by row.
+The minutes are materialized per day in Attendance Daily Fact (see daily_facts);
+apply_fact_metrics formats those rows for display.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+MISSING = -1
+DAY_SECONDS = 86400
+
+
+def to_seconds(value):
+    """Seconds since midnight of a time / timedelta (MySQL TIME) / datetime / "HH:MM[:SS]" value, or MISSING."""
+    if value is None or value in ("", "-", "None"):
+        return MISSING
+    if isinstance(value, datetime):
+        value = value.time()
+    if isinstance(value, time):
+        return value.hour * 3600 + value.minute * 60 + value.second
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        return seconds if 0 <= seconds < DAY_SECONDS else MISSING
+    try:
+        parts = [int(float(p)) for p in str(value).split(":")]
+        hours, minutes, seconds = (parts + [0, 0])[:3]
+        total = hours * 3600 + minutes * 60 + seconds
+        return total if 0 <= total < DAY_SECONDS else MISSING
+    except ValueError:
+        return MISSING
+
+
+def seconds_column(rows, field):
+    return np.fromiter((to_seconds(row.get(field)) for row in rows), dtype=np.int64, count=len(rows))
+
+
+def hours_column(rows, field):
+    return np.fromiter((float(row.get(field) or 0) for row in rows), dtype=np.float64, count=len(rows))
+
+
+def compute_metrics(in_secs, out_secs, shift_starts, shift_ends, working_hours):
+    """
+    Early/late/overtime in whole minutes (MISSING where not applicable) for equally long arrays:
+    - in/out/shift start/end as seconds since midnight
+    - working_hours as float hours
+    Same rules as the report always used: plain time-of-day comparisons for early/late,
+    overtime = working hours - shift duration (overnight shifts wrap past midnight,
+    a missing shift counts as 0 hours).
+    """
+    in_secs, out_secs = np.asarray(in_secs, dtype=np.int64), np.asarray(out_secs, dtype=np.int64)
+    shift_starts, shift_ends = np.asarray(shift_starts, dtype=np.int64), np.asarray(shift_ends, dtype=np.int64)
+    working_hours = np.asarray(working_hours, dtype=np.float64)
+
+    has_in = (in_secs != MISSING) & (shift_starts != MISSING)
+    has_out = (out_secs != MISSING) & (shift_ends != MISSING)
+    entry_delta = in_secs - shift_starts
+    going_delta = out_secs - shift_ends
+
+    has_shift = (shift_starts != MISSING) & (shift_ends != MISSING)
+    shift_seconds = np.where(has_shift, (shift_ends - shift_starts) % DAY_SECONDS, 0)
+    over_time = np.rint((working_hours * 3600 - shift_seconds) / 60).astype(np.int64)
+
+    return {
+        "early_entry": np.where(has_in & (entry_delta < 0), -entry_delta // 60, MISSING),
+        "late_entry": np.where(has_in & (entry_delta > 0), entry_delta // 60, MISSING),
+        "early_going": np.where(has_out & (going_delta < 0), -going_delta // 60, MISSING),
+        "late_going": np.where(has_out & (going_delta > 0), going_delta // 60, MISSING),
+        "over_time": np.where(over_time > 0, over_time, MISSING),
+    }
+
+
+def format_minutes(minutes):
+    """"HH:MM" durations, "-" for MISSING."""
+    return [f"{m // 60:02d}:{m % 60:02d}" if m != MISSING else "-" for m in np.asarray(minutes).tolist()]
+
+
+def format_clock(seconds):
+    """"HH:MM" clock times from seconds since midnight, "-" for MISSING."""
+    return format_minutes(np.where(np.asarray(seconds) != MISSING, np.asarray(seconds) // 60, MISSING))
+
+
+FACT_METRICS = {
+    "early_entry": "early_entry_minutes",
+    "late_entry": "late_entry_minutes",
+    "early_going": "early_going_minutes",
+    "late_going": "late_going_minutes",
+    "over_time": "overtime_minutes",
+}
+
+
+def apply_fact_metrics(rows):
+    """
+    Fill the formatted report columns on Attendance Daily Fact rows (first_in, last_out,
+    actual_seconds, t_working_hours and the *_minutes fields): in_time, out_time,
+    working_hours (actual paired duration), total_working_hours, early_entry, late_entry,
+    early_going, late_going and over_time.
+    """
+    if not rows:
+        return rows
+
+    def minutes_column(field, divisor=1):
+        values = np.fromiter((int(row.get(field) or 0) for row in rows), dtype=np.int64, count=len(rows))
+        return np.where(values > 0, values // divisor, MISSING)
+
+    working_hours = hours_column(rows, "t_working_hours")
+    columns = {
+        "in_time": format_clock(seconds_column(rows, "first_in")),
+        "out_time": format_clock(seconds_column(rows, "last_out")),
+        "working_hours": format_minutes(minutes_column("actual_seconds", 60)),
+        "total_working_hours": format_minutes(
+            np.where(working_hours > 0, np.rint(working_hours * 60).astype(np.int64), MISSING)
+        ),
+    }
+    columns.update({name: format_minutes(minutes_column(field)) for name, field in FACT_METRICS.items()})
+
+    for field, values in columns.items():
+        for row, value in zip(rows, values):
+            row[field] = value
+    return rows
@@ -1,9 +1,12 @@
 import frappe
-from datetime import datetime, timedelta
-from frappe.utils import get_datetime, now_datetime
+from datetime import timedelta
+from frappe.utils import get_datetime, getdate, now_datetime, time_diff_in_hours
 
-# helpers expected to exist in your repo (you referenced them before)
-from .helpers import get_leave_status, is_holiday, calculate_working_hours
+from .helpers import reserve_names
+from .business_time import add_working_hours, get_employee_holiday_list
+from .daily_facts import refresh_daily_facts
+from .locks import ATTENDANCE_LOCK, exclusive
+from .shift_cache import get_shift_type
 
 # ------------------
 # ASSUMPTIONS / TODO
@@ -12,7 +15,6 @@ from .helpers import get_leave_status, is_holiday, calculate_working_hours
 # - Shift information (if used) is in a doctype called "Shift Type" with fields start_time and end_time (HH:MM or time)
 #   If your shift model differs, change get_shift_end_datetime().
 # - Attendance Settings single doctype contains the keys you listed (names used exactly as fields).
-# - calculate_working_hours(first_checkin, last_checkin) returns float hours.
 # ------------------
 
 
@@ -45,20 +47,19 @@ def get_attendance_settings():
     })
 
 
-def get_shift_end_datetime(employee, attendance_date, shift_name):
+def get_shift_end_datetime(employee, attendance_date, shift_name, out_time=None):
     """
     Try to determine the expected shift end datetime for this employee on attendance_date.
-    - First try to read Shift Type (end_time) by name
-    - If shift_name absent or Shift Type missing, fall back to using attendance.out_time (if exists)
+    - First try to read Shift Type (end_time) by name from the shared shift cache
+    - If shift_name absent or Shift Type missing, fall back to using attendance.out_time (if exists);
+      pass `out_time` when the attendance is already loaded to skip that lookup
     - If still missing, assume a default shift end at 18:30 (6:30pm) local date (adjustable)
     """
-    # try Shift Type
+    # try Shift Type (cached, see shift_cache)
     try:
-        if shift_name:
-            # Shift Type might store times as strings or time objects; we try common fields
-            shift = frappe.get_doc("Shift Type", shift_name)
-            end_time = getattr(shift, "end_time", None) or getattr(shift, "end", None)
-            start_time = getattr(shift, "start_time", None) or getattr(shift, "start", None)
+        shift = get_shift_type(shift_name)
+        if shift:
+            end_time = shift.end_time
             if end_time:
                 # combine date + end_time
                 dt = get_datetime(f"{attendance_date} {str(end_time)}")
@@ -68,6 +69,8 @@ def get_shift_end_datetime(employee, attendance_date, shift_name):
         pass
 
     # fallback: try to use any existing attendance out_time
+    if out_time:
+        return get_datetime(out_time)
     att = frappe.get_all("Attendance",
                          filters={"employee": employee, "attendance_date": attendance_date},
                          fields=["out_time"], limit_page_length=1)
@@ -79,165 +82,415 @@ def get_shift_end_datetime(employee, attendance_date, shift_name):
     return fallback
 
 
+AUTO_SUBMIT_GRACE_HOURS = 4        # hours after shift end before a draft is auto-submitted
+AUTO_SUBMIT_BATCH_SIZE = 500       # due attendances submitted per scheduler run
+AUTO_SUBMIT_RETRY_HOURS = 6        # delay before retrying an attendance whose submit failed
+SUBMIT_CHUNK_SIZE = 100            # attendances submitted per commit / realtime event
+DUE_AT_FIELD = "auto_submit_due_at"
+
+
+def get_auto_submit_due_at(employee, attendance_date, shift, working_hours, out_time=None, settings=None):
+    """
+    Datetime from which a draft attendance may be auto-submitted, or None when it never
+    qualifies (working_hours below min_working_hours). Earliest of:
+    1) shift end + AUTO_SUBMIT_GRACE_HOURS
+    2) shift end + regularization_to_hours working hours (weekends and the employee's
+       holidays excluded, see business_time), when regularization is enabled
+    """
+    settings = settings or get_attendance_settings()
+    if (working_hours or 0) < settings.min_working_hours:
+        return None
+
+    shift_end = get_shift_end_datetime(employee, attendance_date, shift, out_time=out_time)
+    due_at = shift_end + timedelta(hours=AUTO_SUBMIT_GRACE_HOURS)
+    if settings.enable_regularization:
+        regularization_end = add_working_hours(
+            shift_end, float(settings.regularization_to_hours or 0), get_employee_holiday_list(employee)
+        )
+        due_at = min(due_at, regularization_end)
+    return due_at
+
+
+def has_due_at_field():
+    return frappe.get_meta("Attendance").has_field(DUE_AT_FIELD)
+
+
+def set_auto_submit_due_at(doc, method=None):
+    """doc_events hook (Attendance validate): keep the auto-submit due time of drafts current."""
+    if not has_due_at_field():
+        return
+    if doc.docstatus != 0:
+        doc.set(DUE_AT_FIELD, None)
+        return
+    doc.set(DUE_AT_FIELD, get_auto_submit_due_at(
+        doc.employee, doc.attendance_date, doc.shift, doc.working_hours, out_time=doc.out_time
+    ))
+
+
+def refresh_auto_submit_due_dates():
+    """Recompute the due time of every draft attendance, e.g. after Attendance Settings change."""
+    if not has_due_at_field():
+        return
+
+    settings = get_attendance_settings()
+    drafts = frappe.get_all("Attendance", filters={"docstatus": 0}, fields=[
+        "name", "employee", "attendance_date", "shift", "working_hours", "out_time", DUE_AT_FIELD
+    ])
+    updates = {}
+    for a in drafts:
+        due_at = get_auto_submit_due_at(a.employee, a.attendance_date, a.shift, a.working_hours, a.out_time, settings)
+        if due_at != (get_datetime(a.get(DUE_AT_FIELD)) if a.get(DUE_AT_FIELD) else None):
+            updates[a.name] = {DUE_AT_FIELD: due_at}
+
+    if updates:
+        frappe.db.bulk_update("Attendance", updates, chunk_size=ATTENDANCE_BATCH_SIZE, update_modified=False)
+    frappe.db.commit()
+
+
 def auto_submit_attendance_doc(att_doc, settings):
     """
     Submit a single attendance document if it meets submission criteria.
     Returns True if submitted.
     """
-    try:
-        # Skip already submitted
-        if att_doc.docstatus == 1:
-            return False
-
-        # compute working_hours if missing
-        working_hours = getattr(att_doc, "working_hours", None)
-        if working_hours is None:
-            # try to compute from in_time/out_time if available
-            if att_doc.in_time and att_doc.out_time:
-                working_hours = calculate_working_hours(att_doc.in_time, att_doc.out_time)
-            else:
-                working_hours = 0.0
-
-        # Rule: require at least min_working_hours
-        if working_hours < settings.min_working_hours:
-            # Not enough hours to be auto-submitted as Present / Half-day
-            return False
-
-        # If reached here, submit
-        doc = frappe.get_doc("Attendance", att_doc.name)
-        # update working_hours and status to reflect calculation (defensive)
-        doc.working_hours = working_hours
-        # choose status based on hours (same logic you used earlier)
-        doc.status = "Present" if working_hours >= settings.min_working_hours else "Half Day"
-
-        # Submit with ignore permissions to allow scheduler/whitelisted calls to submit
-        doc.submit(ignore_permissions=True)
+    return bool(submit_attendances([att_doc.name], settings).submitted)
+
+
+def submit_attendances(names, settings=None, chunk_size=SUBMIT_CHUNK_SIZE):
+    """
+    Batch submit draft attendances.
+    - rows are submitted in chunks of `chunk_size`, with one commit per chunk
+    - every row runs inside its own savepoint, so a failing row is rolled back alone
+    - one aggregated "attendance_auto_submitted" realtime event is sent per chunk
+    Rows below min_working_hours are skipped, like in the single-document path.
+    Returns {submitted, skipped, failed} name lists.
+    """
+    settings = settings or get_attendance_settings()
+    result = frappe._dict({"submitted": [], "skipped": [], "failed": []})
+
+    for i in range(0, len(names), chunk_size):
+        chunk_submitted = []
+        for name in names[i:i + chunk_size]:
+            try:
+                frappe.db.savepoint("attendance_submit")
+                if _submit_attendance(name, settings):
+                    chunk_submitted.append(name)
+                else:
+                    result.skipped.append(name)
+            except Exception as e:
+                frappe.db.rollback(save_point="attendance_submit")
+                frappe.log_error(f"Auto-submit error for {name}: {e}", "Attendance Auto Submit")
+                result.failed.append(name)
+
         frappe.db.commit()
-        frappe.publish_realtime(event="attendance_auto_submitted", message={"name": doc.name})
-        return True
-    except Exception as e:
-        frappe.log_error(f"Auto-submit error for {getattr(att_doc, 'name', '')}: {e}", "Attendance Auto Submit")
+        if chunk_submitted:
+            frappe.publish_realtime(
+                event="attendance_auto_submitted",
+                message={"names": chunk_submitted, "count": len(chunk_submitted)}
+            )
+        result.submitted.extend(chunk_submitted)
+
+    return result
+
+
+def _submit_attendance(name, settings):
+    """Submit one draft attendance without committing. Returns False when it does not qualify."""
+    doc = frappe.get_doc("Attendance", name)
+    # Skip already submitted
+    if doc.docstatus != 0:
         return False
 
+    # compute working_hours if missing
+    working_hours = doc.working_hours
+    if working_hours is None:
+        # try to compute from in_time/out_time if available
+        if doc.in_time and doc.out_time:
+            working_hours = time_diff_in_hours(doc.out_time, doc.in_time)
+        else:
+            working_hours = 0.0
+
+    # Rule: require at least min_working_hours
+    if working_hours < settings.min_working_hours:
+        # Not enough hours to be auto-submitted as Present / Half-day
+        return False
+
+    # update working_hours and status to reflect calculation (defensive)
+    doc.working_hours = working_hours
+    # choose status based on hours (same logic you used earlier)
+    doc.status = "Present" if working_hours >= settings.min_working_hours else "Half Day"
+
+    # Submit with ignore permissions to allow scheduler/whitelisted calls to submit
+    doc.submit(ignore_permissions=True)
+    return True
+
 
+@exclusive(ATTENDANCE_LOCK)
 def auto_submit_due_attendances():
     """
-    Find attendance records that are due for auto-submission and submit them.
-    Two triggers:
-    1) shift end + 4 hours have passed
-    2) regularization period ended (using regularization_to_hours from settings)
+    Submit draft attendance records whose auto_submit_due_at has passed.
+    The due time is filled in when the attendance is created/updated (see get_auto_submit_due_at),
+    so this only reads rows that are due, through the (docstatus, auto_submit_due_at) index,
+    at most AUTO_SUBMIT_BATCH_SIZE per run.
     This function can be invoked from scheduler periodically (eg: every 30 minutes).
+    Runs under the attendance lock; returns None when another attendance run holds it.
     """
+    if not has_due_at_field():
+        return []
+
     settings = get_attendance_settings()
     now = now_datetime()
 
-    # query open attendance records (docstatus = 0)
-    open_att = frappe.get_all("Attendance", filters={"docstatus": 0}, fields=[
+    due = frappe.get_all("Attendance", filters={"docstatus": 0, DUE_AT_FIELD: ["<=", now]}, fields=[
         "name", "employee", "attendance_date", "in_time", "out_time", "working_hours", "shift"
-    ])
+    ], order_by=f"{DUE_AT_FIELD} asc", limit_page_length=AUTO_SUBMIT_BATCH_SIZE)
 
-    submitted_any = []
-    for a in open_att:
-        try:
-            # compute expected shift end datetime
-            shift_end_dt = get_shift_end_datetime(a.employee, a.attendance_date, a.get("shift"))
-
-            # condition 1: 4 hours after shift end
-            if now >= (shift_end_dt + timedelta(hours=4)):
-                # submit if meets working hours rule
-                if (a.working_hours or 0) >= settings.min_working_hours:
-                    if auto_submit_attendance_doc(frappe._dict(a), settings):
-                        submitted_any.append(a.name)
-                    continue
-
-            # condition 2: regularization window passed
-            if settings.enable_regularization:
-                # Interpret regularization_to_hours as hours after shift_end allowed for regularization.
-                # Once that window expires, auto-submit if working_hours >= min_working_hours.
-                reg_to = float(settings.regularization_to_hours or 0)
-                if now >= (shift_end_dt + timedelta(hours=reg_to)):
-                    if (a.working_hours or 0) >= settings.min_working_hours:
-                        if auto_submit_attendance_doc(frappe._dict(a), settings):
-                            submitted_any.append(a.name)
-                        continue
-        except Exception as e:
-            frappe.log_error(f"Error evaluating auto-submit for attendance {a.get('name')}: {e}", "Attendance Auto Submit")
+    result = submit_attendances([a.name for a in due], settings)
 
-    return submitted_any
+    # rows that no longer qualify lose their due time; failed rows are retried later
+    # so they do not take the whole batch every run
+    retry_at = now + timedelta(hours=AUTO_SUBMIT_RETRY_HOURS)
+    updates = {name: {DUE_AT_FIELD: None} for name in result.skipped}
+    updates.update({name: {DUE_AT_FIELD: retry_at} for name in result.failed})
+    if updates:
+        frappe.db.bulk_update("Attendance", updates, chunk_size=ATTENDANCE_BATCH_SIZE, update_modified=False)
+        frappe.db.commit()
+
+    return result.submitted
+
+
+# ------------------------
+# Dirty (employee, date) queue
+# ------------------------
+RECOMPUTE_BATCH_SIZE = 5000
+
+
+def mark_attendance_dirty(pairs):
+    """
+    Queue (employee, date) pairs whose punches changed, for process_attendance_realtime.
+    A pair already queued (unique key on the queue table) gets its version bumped instead, so a
+    run that read the row before this change leaves it queued for the next run. No commit here.
+    """
+    pairs = {(emp, get_datetime(d).date()) for emp, d in pairs if emp and d}
+    if not pairs:
+        return
+
+    now = now_datetime()
+    user = frappe.session.user
+    rows = [(frappe.generate_hash(length=10), user, now, now, user, emp, d) for emp, d in sorted(pairs)]
+    for i in range(0, len(rows), ATTENDANCE_BATCH_SIZE):
+        chunk = rows[i:i + ATTENDANCE_BATCH_SIZE]
+        frappe.db.sql(f"""
+            INSERT INTO `tabAttendance Recompute Queue`
+                (name, owner, creation, modified, modified_by, employee, attendance_date, `version`)
+            VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s, 0)"] * len(chunk))}
+            ON DUPLICATE KEY UPDATE `version` = `version` + 1, modified = VALUES(modified)
+        """, [value for row in chunk for value in row])
+
+
+def mark_checkin_dirty(doc, method=None):
+    """doc_events hook on Employee Checkin insert/delete."""
+    if doc.employee and doc.time:
+        mark_attendance_dirty([(doc.employee, doc.time)])
 
 
 # ------------------------
 # Realtime processing (when checkins exist)
 # ------------------------
+ATTENDANCE_BATCH_SIZE = 500     # rows per bulk insert / bulk update statement
+
+
 def process_attendance_realtime():
     """
-    Recreates the attendance records from Employee Checkin table per employee per date (first and last).
+    Rebuilds attendance records from Employee Checkin (first and last punch per date)
+    for the (employee, date) pairs queued by the ingest path since the last run.
     This function:
-    - groups checkins by date
-    - calculates working_hours using calculate_working_hours()
-    - inserts or updates Attendance records (docstatus 0)
+    - drains up to RECOMPUTE_BATCH_SIZE pairs from Attendance Recompute Queue
+    - builds their Attendance with build_attendance() (one grouped query + batched upserts)
+    - refreshes their Attendance Daily Fact rows
     - DOES NOT auto-submit here; returning the list of created/updated attendances for caller to decide.
+    Returns None when the rebuild failed (logged; its pairs stay queued for the next run).
     """
-    employees = frappe.get_all("Employee", filters={"status": "Active"}, fields=["name", "default_shift"])
-    created_or_updated = []
+    queued = frappe.get_all(
+        "Attendance Recompute Queue",
+        fields=["name", "employee", "attendance_date", "version"],
+        order_by="employee asc, attendance_date asc",
+        limit_page_length=RECOMPUTE_BATCH_SIZE
+    )
+    if not queued:
+        return []
 
-    for emp in employees:
-        try:
-            process_employee_attendance_realtime(emp.name, emp.default_shift or "", created_or_updated)
-        except Exception as e:
-            frappe.log_error(f"{emp.name} attendance error: {e}", "Realtime Attendance Error")
+    created_or_updated = []
+    pairs = {(q.employee, getdate(q.attendance_date)) for q in queued}
+    try:
+        build_attendance(
+            employees=list({q.employee for q in queued}),
+            from_date=min(q.attendance_date for q in queued),
+            to_date=max(q.attendance_date for q in queued),
+            pairs=pairs,
+            created_list=created_or_updated
+        )
+        # bulk attendance writes skip doc_events, so refresh the reporting facts here
+        refresh_daily_facts(pairs=pairs)
+        # only rows nobody re-queued since they were read: a bumped version means new punches
+        # this run may not have seen, so the pair stays for the next run
+        by_version = {}
+        for q in queued:
+            by_version.setdefault(q.version or 0, []).append(q.name)
+        for version, names in by_version.items():
+            frappe.db.delete("Attendance Recompute Queue", {"name": ["in", names], "version": version})
+        frappe.db.commit()
+    except Exception as e:
+        # queue rows stay for the next run
+        frappe.db.rollback()
+        frappe.log_error(f"Attendance rebuild for {len(queued)} queued dates failed: {e}", "Realtime Attendance Error")
+        return None
 
-    frappe.db.commit()
     return created_or_updated
 
 
-def process_employee_attendance_realtime(employee, shift, created_list=None):
-    checkins = frappe.get_all(
-        "Employee Checkin",
-        filters={"employee": employee},
-        fields=["name", "time", "log_type"],
-        order_by="time asc"
-    )
+def process_employee_attendance_realtime(employee, shift=None, created_list=None):
+    """Rebuild one employee's attendance for every date with checkins. No commit here."""
+    build_attendance(employees=[employee], created_list=created_list, shift=shift)
+
 
-    by_date = {}
-    for c in checkins:
-        d = get_datetime(c.time).date()
-        by_date.setdefault(d, []).append(c)
-
-    for date, daily in by_date.items():
-        if not daily:
-            continue
-        first, last = daily[0], daily[-1]
-        hours = calculate_working_hours(first.time, last.time)
-        status = "Present" if hours >= 4 else "Half Day"
-
-        existing_name = frappe.db.exists("Attendance", {"employee": employee, "attendance_date": date})
-        if existing_name:
-            frappe.db.set_value("Attendance", existing_name, {
-                "in_time": first.time,
-                "out_time": last.time,
-                "working_hours": hours,
-                "status": status,
-                "shift": shift
-            })
-            if created_list is not None:
-                created_list.append(existing_name)
+def get_daily_punch_summary(employees=None, from_date=None, to_date=None):
+    """
+    First IN, last OUT, punch count and span (seconds) per (employee, date),
+    computed in a single grouped query over Employee Checkin.
+    """
+    conditions, values = [], {}
+    if employees:
+        conditions.append("employee IN %(employees)s")
+        values["employees"] = tuple(employees)
+    if from_date:
+        conditions.append("time >= %(from_time)s")
+        values["from_time"] = get_datetime(f"{getdate(from_date)} 00:00:00")
+    if to_date:
+        conditions.append("time < %(to_time)s")
+        values["to_time"] = get_datetime(f"{getdate(to_date) + timedelta(days=1)} 00:00:00")
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
+    return frappe.db.sql(f"""
+        SELECT
+            employee,
+            DATE(time) AS attendance_date,
+            MIN(time) AS first_in,
+            MAX(time) AS last_out,
+            COUNT(*) AS punch_count,
+            TIMESTAMPDIFF(SECOND, MIN(time), MAX(time)) AS span_seconds
+        FROM `tabEmployee Checkin`
+        {where}
+        GROUP BY employee, DATE(time)
+    """, values, as_dict=True)
+
+
+def build_attendance(employees=None, from_date=None, to_date=None, pairs=None, created_list=None, shift=None):
+    """
+    Set-based attendance builder.
+    - get_daily_punch_summary() gives first/last punch per (employee, date) in one query
+    - existing Attendance for the range is loaded in one query
+    - new rows go in with bulk_insert, changed rows with bulk_update (ATTENDANCE_BATCH_SIZE per statement)
+    `pairs` keeps only those (employee, date) pairs of the summary; `shift` overrides
+    the employee's default shift. Only Active employees are processed. No commit here.
+    Returns the names of created/updated Attendance records.
+    """
+    created_list = created_list if created_list is not None else []
+    summary = get_daily_punch_summary(employees, from_date, to_date)
+    if pairs is not None:
+        summary = [r for r in summary if (r.employee, getdate(r.attendance_date)) in pairs]
+    if not summary:
+        return created_list
+
+    profiles = {
+        e.name: e for e in frappe.get_all(
+            "Employee",
+            filters={"name": ["in", list({r.employee for r in summary})], "status": "Active"},
+            fields=["name", "employee_name", "company", "department", "default_shift"]
+        )
+    }
+    summary = [r for r in summary if r.employee in profiles]
+    if not summary:
+        return created_list
+
+    existing = {}
+    for a in frappe.get_all(
+        "Attendance",
+        filters={
+            "employee": ["in", list({r.employee for r in summary})],
+            "attendance_date": ["between", [min(r.attendance_date for r in summary), max(r.attendance_date for r in summary)]],
+            "docstatus": ["<", 2]
+        },
+        fields=["name", "docstatus", "employee", "attendance_date", "in_time", "out_time", "working_hours", "status", "shift"]
+    ):
+        existing.setdefault((a.employee, getdate(a.attendance_date)), a)
+
+    settings = get_attendance_settings()
+    with_due_at = has_due_at_field()
+    to_insert, updates = [], {}
+    for r in summary:
+        emp = profiles[r.employee]
+        hours = round((r.span_seconds or 0) / 3600, 6)
+        values = {
+            "in_time": get_datetime(r.first_in),
+            "out_time": get_datetime(r.last_out),
+            "working_hours": hours,
+            "status": "Present" if hours >= 4 else "Half Day",
+            "shift": (emp.default_shift or "") if shift is None else shift,
+        }
+        if with_due_at:
+            # bulk writes skip the validate hook, so fill the auto-submit due time here
+            values[DUE_AT_FIELD] = get_auto_submit_due_at(
+                r.employee, r.attendance_date, values["shift"], hours, out_time=values["out_time"], settings=settings
+            )
+        current = existing.get((r.employee, getdate(r.attendance_date)))
+        if current:
+            if current.docstatus != 0:
+                values.pop(DUE_AT_FIELD, None)
+            if _attendance_changed(current, values):
+                updates[current.name] = values
+            created_list.append(current.name)
         else:
-            doc = frappe.get_doc({
-                "doctype": "Attendance",
-                "employee": employee,
-                "attendance_date": date,
-                "shift": shift,
-                "in_time": first.time,
-                "out_time": last.time,
-                "working_hours": hours,
-                "status": status
-            })
-            doc.insert(ignore_permissions=True)
-            if created_list is not None:
-                created_list.append(doc.name)
-
-    # no commit here: caller should commit once for batch operations
+            to_insert.append(dict(values, employee=emp.name, employee_name=emp.employee_name,
+                company=emp.company, department=emp.department, attendance_date=getdate(r.attendance_date)))
+
+    if updates:
+        frappe.db.bulk_update("Attendance", updates, chunk_size=ATTENDANCE_BATCH_SIZE)
+    if to_insert:
+        created_list.extend(_bulk_insert_attendance(to_insert))
+
+    return created_list
+
+
+def _attendance_changed(current, values):
+    return (
+        get_datetime(current.in_time) != values["in_time"]
+        or get_datetime(current.out_time) != values["out_time"]
+        or round(float(current.working_hours or 0), 6) != values["working_hours"]
+        or current.status != values["status"]
+        or (current.shift or "") != values["shift"]
+    )
+
+
+def _bulk_insert_attendance(rows):
+    """Insert draft Attendance rows with one naming-series reservation. Returns their names."""
+    meta = frappe.get_meta("Attendance")
+    columns = set(meta.get_valid_columns())
+    naming_series = meta.get_field("naming_series")
+    series = (naming_series.default or (naming_series.options or "").split("\n")[0]) if naming_series else None
+
+    extra = {"naming_series": series} if series and "naming_series" in columns else {}
+    data_fields = [f for f in rows[0] if f in columns] + list(extra)
+
+    now = now_datetime()
+    user = frappe.session.user
+    names = reserve_names("Attendance", len(rows))
+    fields = ["name", "owner", "creation", "modified", "modified_by", "docstatus"]
+    values = [
+        [name, user, now, now, user, 0] + [dict(row, **extra).get(f) for f in data_fields]
+        for name, row in zip(names, rows)
+    ]
+
+    frappe.db.bulk_insert("Attendance", fields + data_fields, values, chunk_size=ATTENDANCE_BATCH_SIZE)
+    return names
 
 
 def auto_submit_new_attendances(attendance_names):
@@ -250,31 +503,20 @@ def auto_submit_new_attendances(attendance_names):
         return []
 
     settings = get_attendance_settings()
-    submitted = []
-    for name in attendance_names:
+    now = now_datetime()
+    drafts = frappe.get_all("Attendance", filters={"name": ["in", attendance_names], "docstatus": 0}, fields=[
+        "name", "employee", "attendance_date", "shift", "working_hours", "out_time"
+    ])
+
+    due = []
+    for a in drafts:
         try:
-            doc = frappe.get_doc("Attendance", name)
-            # re-use the logic in auto_submit_due_attendances by wrapping doc into a dict
-            # We'll check: if now >= shift_end+4h or regularization expired, submit.
-            shift_end_dt = get_shift_end_datetime(doc.employee, doc.attendance_date, doc.shift)
-            now = now_datetime()
-
-            if now >= (shift_end_dt + timedelta(hours=4)):
-                if (doc.working_hours or 0) >= settings.min_working_hours:
-                    doc.submit(ignore_permissions=True)
-                    submitted.append(name)
-                    continue
-
-            if settings.enable_regularization:
-                reg_to = float(settings.regularization_to_hours or 0)
-                if now >= (shift_end_dt + timedelta(hours=reg_to)):
-                    if (doc.working_hours or 0) >= settings.min_working_hours:
-                        doc.submit(ignore_permissions=True)
-                        submitted.append(name)
-                        continue
+            due_at = get_auto_submit_due_at(
+                a.employee, a.attendance_date, a.shift, a.working_hours, out_time=a.out_time, settings=settings
+            )
+            if due_at and now >= due_at:
+                due.append(a.name)
         except Exception as e:
-            frappe.log_error(f"Error in auto_submit_new_attendances for {name}: {e}", "Attendance Auto Submit")
+            frappe.log_error(f"Error in auto_submit_new_attendances for {a.name}: {e}", "Attendance Auto Submit")
 
-    if submitted:
-        frappe.db.commit()
-    return submitted
+    return submit_attendances(due, settings).submitted if due else []
@@ -1,71 +1,273 @@
-import frappe, os, json
-from frappe.utils import getdate, nowdate
+import frappe, json, time
+from frappe.utils import cint, get_datetime, now_datetime
 from zk import ZK
+from . import log_store
 
 PUNCH_MAPPING = {
     0: "Check-In", 1: "Check-Out", 2: "Break-Out", 3: "Break-In",
     4: "Overtime Start", 5: "Overtime End"
 }
 
-ATTENDANCE_NAME = "attendance_logs"
-ATTENDANCE_DIR = frappe.get_site_path("public", "files", ATTENDANCE_NAME)
+DEFAULT_DEVICE_PORT = 4370
+DEVICE_TIMEOUT = 10        # seconds, ZK socket timeout
 
 
 def get_attendance_file_path(ip):
-    date_str = getdate(nowdate()).strftime("%Y-%m-%d")
-    return os.path.join(ATTENDANCE_DIR, f"attendance_{ip}_{date_str}.json")
+    return log_store.get_store_path(ip)
 
 
 def load_attendance_data(ip):
-    file_path = get_attendance_file_path(ip)
-    if os.path.exists(file_path):
-        with open(file_path, "r") as f:
-            return json.load(f)
-    return []
+    return list(log_store.iter_records(ip))
 
 
-def save_attendance_data(ip, attendance):
-    os.makedirs(ATTENDANCE_DIR, exist_ok=True)
-    file_path = get_attendance_file_path(ip)
-    with open(file_path, "w") as f:
-        json.dump(attendance, f, indent=4)
+def read_device_logs(ip, port, timeout=DEVICE_TIMEOUT, known_record_count=None):
+    """
+    Read attendance logs from a device. Raises on connection errors.
+    Returns (logs, record_count). When the device reports the same record count
+    as `known_record_count`, the log buffer is not downloaded and logs is None.
+    """
+    conn = ZK(ip, port=int(port or DEFAULT_DEVICE_PORT), timeout=timeout)
+    connection = conn.connect()
+    try:
+        connection.read_sizes()
+        record_count = connection.records
+        if known_record_count is not None and record_count == known_record_count:
+            return None, record_count
+        return connection.get_attendance() or [], record_count
+    finally:
+        connection.disconnect()
 
 
 def fetch_attendance_from_device(ip, port):
     """Fetch logs from biometric device using zk library."""
     try:
-        conn = ZK(ip, port=int(port), timeout=10)
-        connection = conn.connect()
-        attendance_logs = connection.get_attendance()
-        connection.disconnect()
-        return attendance_logs
+        logs, _ = read_device_logs(ip, port)
+        return logs
     except Exception as e:
         frappe.log_error(f"Error connecting to device {ip}: {e}", "Biometric Fetch Error")
         return []
 
 
-def process_attendance_logs(ip, logs):
-    """Merge new logs into JSON file and return new records."""
-    existing = load_attendance_data(ip)
-    existing_keys = {(i["user_id"], i["timestamp"]) for i in existing}
-    new_records = []
+def fetch_from_device(device):
+    """
+    Read the logs of one device (each sync job handles one device, see device_sync).
+    - a device whose record count matches its stored `last_device_record_count` is not
+      downloaded (unchanged=True)
+    - errors are returned, not logged, so the caller decides how to report them
+    Returns {device, ip, port, logs, record_count, unchanged, error, elapsed}
+    """
+    result = frappe._dict({
+        "device": device,
+        "ip": device.get("device_ip"),
+        "port": device.get("device_port") or DEFAULT_DEVICE_PORT,
+        "logs": [],
+        "record_count": None,
+        "unchanged": False,
+        "error": None,
+        "elapsed": 0.0,
+    })
+    started = time.monotonic()
+    try:
+        logs, result.record_count = read_device_logs(
+            result.ip, result.port, known_record_count=get_known_record_count(device)
+        )
+        result.logs = logs or []
+        result.unchanged = logs is None
+    except Exception as e:
+        result.error = str(e) or e.__class__.__name__
+    result.elapsed = round(time.monotonic() - started, 3)
+    return result
+
+
+def get_known_record_count(device):
+    """Record count stored by the last sync, or None when the device has no cursor yet."""
+    if not device.get("last_synced_timestamp"):
+        return None
+    return cint(device.get("last_device_record_count"))
+
+
+def filter_logs_after_cursor(logs, device):
+    """
+    Drop logs older than the device's sync cursor.
+    Logs at exactly the cursor timestamp are kept; the checkin dedup
+    (existing keys + unique index) takes care of them.
+    """
+    cursor = device.get("last_synced_timestamp")
+    if not cursor:
+        return logs
+    cursor = get_datetime(cursor)
+    return [log for log in logs if log.timestamp >= cursor]
+
+
+def update_sync_cursor(device, logs, record_count, failed_since=None):
+    """
+    Persist the newest ingested log and the device record count on the device row.
+    With `failed_since` (the earliest punch whose checkin failed to insert) the cursor stays
+    before that punch and the record count is kept, so the next sync downloads and retries it.
+    """
+    values = {}
+    if failed_since:
+        logs = [log for log in logs if log.timestamp < get_datetime(failed_since)]
+    else:
+        values["last_device_record_count"] = cint(record_count)
+    if logs:
+        newest = max(logs, key=lambda log: log.timestamp)
+        cursor = device.get("last_synced_timestamp")
+        if not cursor or newest.timestamp >= get_datetime(cursor):
+            values["last_synced_timestamp"] = newest.timestamp
+            values["last_synced_uid"] = cint(newest.uid)
+
+    if values:
+        frappe.db.set_value("Biometric Device Settings", device.name, values, update_modified=False)
+
+
+def get_uncommitted_logs(logs):
+    """
+    Check fetched logs against the database.
+    Returns (missing, unmapped):
+    - missing: logs of an active, mapped employee with no Employee Checkin at that time
+    - unmapped: logs whose device user is not mapped to an active employee
+    """
+    if not logs:
+        return [], []
+
+    user_ids = list({str(log.user_id) for log in logs})
+    emp_map = {
+        e.attendance_device_id: e.name
+        for e in frappe.get_all(
+            "Employee", filters={"attendance_device_id": ["in", user_ids], "status": "Active"},
+            fields=["name", "attendance_device_id"]
+        )
+    }
+
+    committed = set()
+    if emp_map:
+        times = [log.timestamp for log in logs]
+        committed = {
+            (c.employee, get_datetime(c.time))
+            for c in frappe.get_all(
+                "Employee Checkin",
+                filters={
+                    "employee": ["in", list(set(emp_map.values()))],
+                    "time": ["between", [min(times), max(times)]]
+                },
+                fields=["employee", "time"]
+            )
+        }
 
+    missing, unmapped = [], []
     for log in logs:
-        ts = log.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        key = (log.user_id, ts)
-        if key not in existing_keys:
-            new_records.append({
-                "uid": log.uid,
-                "user_id": log.user_id,
-                "timestamp": ts,
-                "status": log.status,
-                "punch": log.punch,
-                "punch_type": PUNCH_MAPPING.get(log.punch, "Unknown"),
-                "device_ip": ip
-            })
-
-    if new_records:
-        existing.extend(new_records)
-        save_attendance_data(ip, existing)
-
-    return new_records
+        emp = emp_map.get(str(log.user_id))
+        if not emp:
+            unmapped.append(log)
+        elif (emp, log.timestamp) not in committed:
+            missing.append(log)
+    return missing, unmapped
+
+
+def clear_device_logs(device, logs, record_count):
+    """
+    Clear the attendance buffer of a device whose logs are already committed as checkins.
+    Nothing is cleared unless:
+    - `logs` is the device's full buffer (len(logs) == record_count)
+    - every log of a mapped employee exists as an Employee Checkin
+    - the device still holds exactly `record_count` records (checked with the device disabled,
+      so no punch can land between the check and the clear)
+    The purged records are stored in a Biometric Device Purge Log.
+    Returns True when the device was cleared.
+    """
+    ip = device.get("device_ip")
+    if not logs or len(logs) != cint(record_count):
+        return False
+
+    missing, unmapped = get_uncommitted_logs(logs)
+    if missing:
+        frappe.log_error(
+            f"Not clearing device {ip}: {len(missing)} fetched logs have no Employee Checkin yet",
+            "Biometric Device Clear"
+        )
+        return False
+
+    timestamps = [log.timestamp for log in logs]
+    purge_log = frappe.get_doc({
+        "doctype": "Biometric Device Purge Log",
+        "device": device.name,
+        "device_ip": ip,
+        "purged_on": now_datetime(),
+        "record_count": len(logs),
+        "unmapped_count": len(unmapped),
+        "first_punch": min(timestamps),
+        "last_punch": max(timestamps),
+        "purged_records": json.dumps([{
+            "uid": log.uid,
+            "user_id": log.user_id,
+            "timestamp": log.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            "status": log.status,
+            "punch": log.punch,
+        } for log in logs])
+    })
+
+    # the purge log is committed before the device is touched: it must survive a rollback of
+    # anything after the clear, it is the only copy of the purged records
+    purge_log.insert(ignore_permissions=True)
+    frappe.db.commit()
+
+    clear_sent = False
+    try:
+        connection = ZK(ip, port=int(device.get("device_port") or DEFAULT_DEVICE_PORT), timeout=DEVICE_TIMEOUT).connect()
+        try:
+            connection.disable_device()
+            try:
+                connection.read_sizes()
+                if connection.records != cint(record_count):
+                    frappe.logger().info(
+                        f"Not clearing device {ip}: record count changed from {record_count} to {connection.records}"
+                    )
+                    _discard_purge_log(purge_log)
+                    return False
+                clear_sent = True
+                connection.clear_attendance()
+            finally:
+                connection.enable_device()
+        finally:
+            connection.disconnect()
+
+        frappe.db.set_value("Biometric Device Settings", device.name, "last_device_record_count", 0, update_modified=False)
+        frappe.db.commit()
+        return True
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Error clearing device {ip}: {e}", "Biometric Device Clear")
+        if not clear_sent:
+            # the device was never cleared, nothing was purged
+            _discard_purge_log(purge_log)
+        return False
+
+
+def _discard_purge_log(purge_log):
+    frappe.delete_doc("Biometric Device Purge Log", purge_log.name, ignore_permissions=True, force=True)
+    frappe.db.commit()
+
+
+def logs_to_records(ip, logs):
+    """Raw punch records ({uid, user_id, timestamp, status, punch, punch_type, device_ip}) of device logs."""
+    return [{
+        "uid": log.uid,
+        "user_id": log.user_id,
+        "timestamp": log.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+        "status": log.status,
+        "punch": log.punch,
+        "punch_type": PUNCH_MAPPING.get(log.punch, "Unknown"),
+        "device_ip": ip
+    } for log in logs]
+
+
+def process_attendance_logs(ip, logs):
+    """
+    Archive logs in the device's raw punch store and return their records.
+    The store is a raw archive only: checkins are created from all returned records and the
+    database dedup skips the ones already stored, so a rolled back sync loses nothing.
+    """
+    records = logs_to_records(ip, logs)
+    log_store.append_records(ip, records)
+    return records
@@ -0,0 +1,160 @@
+"""
+Business-time calculator: hours elapsed between two timestamps counting only working days.
+A working day is a day that is not a Holiday of the employee's Holiday List; the list carries
+its own weekly offs (Holiday rows flagged weekly_off). Without a list, and on days outside the
+list's from/to dates, Saturday and Sunday are off.
+
+Per holiday list a cumulative table holds the number of working days before each date
+of a span of whole years, so
+- working_hours_between(a, b) is two table lookups and a subtraction
+- add_working_hours(a, hours) is the inverse, a bisect on the same table
+Tables are cached per request (frappe.local) and in Redis, and evicted by the
+Holiday List doc_events below.
+"""
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+
+import frappe
+from frappe.utils import get_datetime, getdate
+
+from .shift_cache import get_employee_profile
+
+CALENDAR_KEY = "at_biometric_business_calendar"
+HOURS_PER_DAY = 24
+WEEKEND_DAYS = (5, 6)      # Saturday, Sunday: weekly offs of days no Holiday List covers
+NO_HOLIDAY_LIST = "__weekends__"
+
+
+def _local():
+    store = getattr(frappe.local, "at_biometric_calendars", None)
+    if store is None:
+        store = frappe.local.at_biometric_calendars = {}
+    return store
+
+
+def _build_calendar(holiday_list, first_year, last_year):
+    start, end = date(first_year, 1, 1), date(last_year, 12, 31)
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    # days the list does not cover (or all days without a list) fall back to Saturday / Sunday
+    covered = None
+    if holiday_list != NO_HOLIDAY_LIST:
+        covered = frappe.db.get_value("Holiday List", holiday_list, ["from_date", "to_date"], as_dict=True)
+    if covered and covered.from_date and covered.to_date:
+        first, last = getdate(covered.from_date), getdate(covered.to_date)
+        rows = frappe.get_all(
+            "Holiday", filters={"parent": holiday_list, "holiday_date": ["between", [start, end]]},
+            fields=["holiday_date", "weekly_off"]
+        )
+        holidays = {getdate(h.holiday_date) for h in rows}
+        weekly_offs = {getdate(h.holiday_date) for h in rows if h.weekly_off}
+    else:
+        first = last = None
+        holidays, weekly_offs = set(), set()
+
+    uncovered = {
+        day for day in days
+        if day.weekday() in WEEKEND_DAYS and not (first and first <= day <= last)
+    }
+    holidays |= uncovered
+    weekly_offs |= uncovered
+
+    # cum[i] = working days before start + i days
+    cum = [0]
+    for day in days:
+        cum.append(cum[-1] + (day not in holidays))
+    return frappe._dict({
+        "start": start, "first_year": first_year, "last_year": last_year, "cum": cum,
+        # day offsets from start of the weekly offs, to tell weekends from other holidays
+        "weekly_offs": {(day - start).days for day in weekly_offs},
+    })
+
+
+def get_calendar(holiday_list=None, years=()):
+    """The cumulative working-day table of a holiday list, covering at least `years`."""
+    holiday_list = holiday_list or NO_HOLIDAY_LIST
+    years = list(years) or [date.today().year]
+    local = _local()
+
+    calendar = local.get(holiday_list)
+    if calendar is None:
+        cached = frappe.cache().hget(CALENDAR_KEY, holiday_list)
+        # tables cached before weekly offs came from the list are rebuilt
+        calendar = frappe._dict(cached) if cached and "weekly_offs" in cached else None
+
+    if not calendar or min(years) < calendar.first_year or max(years) > calendar.last_year:
+        first_year = min(years + ([calendar.first_year] if calendar else []))
+        last_year = max(years + ([calendar.last_year] if calendar else []))
+        calendar = _build_calendar(holiday_list, first_year, last_year)
+        frappe.cache().hset(CALENDAR_KEY, holiday_list, dict(calendar))
+
+    local[holiday_list] = calendar
+    return calendar
+
+
+def _position(calendar, dt):
+    """Working hours from the start of the calendar up to `dt`."""
+    idx = (dt.date() - calendar.start).days
+    hours = calendar.cum[idx] * HOURS_PER_DAY
+    if calendar.cum[idx + 1] > calendar.cum[idx]:
+        hours += (dt - datetime.combine(dt.date(), time.min)).total_seconds() / 3600
+    return hours
+
+
+def working_hours_between(start, end, holiday_list=None):
+    """Working hours between two datetimes (negative when end is before start)."""
+    start, end = get_datetime(start), get_datetime(end)
+    calendar = get_calendar(holiday_list, (start.year, end.year))
+    return _position(calendar, end) - _position(calendar, start)
+
+
+def add_working_hours(start, hours, holiday_list=None):
+    """The datetime reached after `hours` working hours from `start` (inverse of working_hours_between)."""
+    start = get_datetime(start)
+    if hours <= 0:
+        return start
+
+    years = [start.year]
+    while True:
+        calendar = get_calendar(holiday_list, years)
+        target = (_position(calendar, start) + hours) / HOURS_PER_DAY
+        if target <= calendar.cum[-1]:
+            break
+        years.append(calendar.last_year + 1)
+
+    # first day index whose working-day count before it reaches the target
+    idx = bisect_left(calendar.cum, target)
+    day = calendar.start + timedelta(days=idx - 1)
+    return datetime.combine(day, time.min) + timedelta(hours=(target - calendar.cum[idx - 1]) * HOURS_PER_DAY)
+
+
+def is_working_day(day, holiday_list=None):
+    """Whether `day` is a working day of the holiday list (one table lookup)."""
+    day = getdate(day)
+    calendar = get_calendar(holiday_list, (day.year,))
+    idx = (day - calendar.start).days
+    return calendar.cum[idx + 1] > calendar.cum[idx]
+
+
+def is_weekly_off(day, holiday_list=None):
+    """Whether `day` is a weekly off of the holiday list (Saturday / Sunday without a list)."""
+    day = getdate(day)
+    calendar = get_calendar(holiday_list, (day.year,))
+    return (day - calendar.start).days in calendar.weekly_offs
+
+
+def get_employee_holiday_list(employee):
+    """The employee's Holiday List, falling back to the company default, or None."""
+    profile = get_employee_profile(employee)
+    if not profile:
+        return None
+    if profile.holiday_list:
+        return profile.holiday_list
+    if profile.company:
+        return frappe.get_cached_value("Company", profile.company, "default_holiday_list")
+    return None
+
+
+def clear_business_calendar_cache(doc, method=None):
+    """doc_events hook on Holiday List update/trash."""
+    frappe.cache().hdel(CALENDAR_KEY, doc.name)
+    _local().pop(doc.name, None)
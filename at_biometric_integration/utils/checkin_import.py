@@ -0,0 +1,90 @@
+"""
+Server-side import of Employee Checkins from a device export (CSV / XLSX / XLS / ZK attlog .dat)
+uploaded as a File.
+- import_checkins (whitelisted) only validates and enqueues; the work runs as a background job,
+  so it survives the browser tab closing
+- the file is streamed by punch_parsers in fixed-size chunks; device IDs resolve through one
+  preloaded Employee map
+- each chunk goes through checkin_processing.create_checkins_from_records, like device syncs
+- progress goes to the uploading user over realtime ("checkin_import_progress")
+"""
+import os
+
+import frappe
+
+from .checkin_processing import create_checkins_from_records
+from .punch_parsers import PUNCH_CHUNK_SIZE, SUPPORTED_EXTENSIONS, iter_punch_chunks
+
+PROGRESS_EVENT = "checkin_import_progress"
+
+
+@frappe.whitelist()
+def import_checkins(file_url):
+    """Queue the import of an uploaded device export. Returns the import_id used in the progress events."""
+    frappe.has_permission("Employee Checkin", "create", throw=True)
+
+    file_doc = frappe.get_doc("File", {"file_url": file_url})
+    frappe.has_permission("File", "read", doc=file_doc, throw=True)
+    extension = os.path.splitext(file_doc.file_name or file_url)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        frappe.throw(f"Unsupported file type {extension or '(none)'}: upload a .csv, .xlsx, .xls or .dat export")
+
+    import_id = frappe.generate_hash(length=10)
+    frappe.enqueue(
+        "at_biometric_integration.utils.checkin_import.run_checkin_import",
+        queue="long",
+        timeout=4 * 3600,
+        job_id=f"at_biometric_checkin_import::{import_id}",
+        file_url=file_url,
+        import_id=import_id,
+        user=frappe.session.user,
+        enqueue_after_commit=True
+    )
+    return {"import_id": import_id}
+
+
+def run_checkin_import(file_url, import_id, user=None):
+    """Background job: stream the file into Employee Checkins, PUNCH_CHUNK_SIZE records at a time."""
+    user = user or frappe.session.user
+    progress = frappe._dict({
+        "import_id": import_id, "status": "Running", "progress": 0.0,
+        "rows": 0, "created": 0, "skipped": 0, "failed": 0, "unmatched": 0, "invalid": 0,
+    })
+
+    try:
+        path = frappe.get_doc("File", {"file_url": file_url}).get_full_path()
+        device_map = get_device_employee_map()
+
+        for records, position in iter_punch_chunks(path, PUNCH_CHUNK_SIZE, stats=progress):
+            stats = create_checkins_from_records(records, emp_map=device_map)
+            progress.rows += len(records)
+            progress.created += stats.created
+            progress.failed += stats.failed
+            progress.unmatched += stats.unmatched
+            progress.skipped += stats.skipped - stats.unmatched
+            progress.progress = position
+            _publish(progress, user)
+
+        progress.update({"status": "Completed", "progress": 100.0})
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Checkin import {import_id} of {file_url} failed: {e}\n{frappe.get_traceback()}", "Checkin Import Error")
+        progress.update({"status": "Failed", "error": str(e)})
+
+    _publish(progress, user)
+    return progress
+
+
+def get_device_employee_map():
+    """{attendance_device_id: Employee} for every Active employee with a device ID, from one query."""
+    return {
+        e.attendance_device_id: e
+        for e in frappe.get_all(
+            "Employee", filters={"attendance_device_id": ["is", "set"], "status": "Active"},
+            fields=["name", "employee_name", "attendance_device_id"]
+        )
+    }
+
+
+def _publish(progress, user):
+    frappe.publish_realtime(PROGRESS_EVENT, dict(progress), user=user)
@@ -1,54 +1,205 @@
-import frappe
-from frappe.utils import get_datetime
+import frappe, time
+from frappe.utils import get_datetime, now_datetime
 
-def create_frappe_attendance_multi(devices):
-    """Create Employee Checkins from stored JSON logs for each device."""
-    from .biometric_sync import load_attendance_data
+from .helpers import reserve_names
+from .attendance_processing import mark_attendance_dirty
 
-    all_logs = []
+BULK_THRESHOLD = 200       # batches with at least this many new checkins take the bulk path
+BULK_CHUNK_SIZE = 500      # rows per multi-row INSERT / commit
+
+
+def create_frappe_attendance_multi(devices, records=None, bulk=None):
+    """
+    Create Employee Checkins from stored logs for each device.
+    `records` limits the run to those raw records (e.g. a device's logs after its sync cursor)
+    instead of the whole day's store. The store is streamed in chunks of PUNCH_CHUNK_SIZE records.
+    Returns stats: {created, skipped, failed, unmatched, first_failed, elapsed, rows_per_sec}.
+    `bulk` forces (True) or disables (False) the bulk insert path; by default it is
+    used when the batch has at least BULK_THRESHOLD new checkins.
+    """
+    from . import log_store
+    from .punch_parsers import iter_chunks
+
+    if records is not None:
+        return create_checkins_from_records(list(records), bulk=bulk)
+
+    stats = _empty_stats()
     for device in devices:
         ip = device["device_ip"]
-        logs = load_attendance_data(ip)
-        for record in logs:
-            record["device_ip"] = ip
-        all_logs.extend(logs)
-
-    if not all_logs:
-        return
-
-    user_ids = list(set([r["user_id"] for r in all_logs]))
-    employees = frappe.get_all(
-        "Employee", filters={"attendance_device_id": ["in", user_ids], "status": "Active"},
-        fields=["name", "attendance_device_id"]
+        for chunk in iter_chunks(log_store.iter_records(ip)):
+            for record in chunk:
+                record["device_ip"] = ip
+            _add_stats(stats, create_checkins_from_records(chunk, bulk=bulk))
+    return stats
+
+
+def create_checkins_from_records(records, bulk=None, emp_map=None):
+    """
+    Create Employee Checkins for one batch of raw punch records ({user_id, timestamp, punch[, device_ip]}).
+    `emp_map` ({attendance_device_id: Employee}) is looked up per batch when not given.
+    Records of unknown device IDs and already stored punches are skipped.
+    """
+    if not records:
+        return _empty_stats()
+
+    if emp_map is None:
+        user_ids = list(set([r["user_id"] for r in records]))
+        employees = frappe.get_all(
+            "Employee", filters={"attendance_device_id": ["in", user_ids], "status": "Active"},
+            fields=["name", "employee_name", "attendance_device_id"]
+        )
+        emp_map = {e.attendance_device_id: e for e in employees}
+    matched = [r for r in records if r["user_id"] in emp_map]
+    existing = get_existing_checkin_keys(
+        list({emp_map[r["user_id"]].name for r in matched}),
+        [r["timestamp"] for r in matched]
     )
-    emp_map = {e.attendance_device_id: e.name for e in employees}
 
-    timestamps = [r["timestamp"] for r in all_logs]
-    existing = {
+    rows = []
+    for r in matched:
+        emp = emp_map[r["user_id"]]
+        if (emp.name, r["timestamp"]) in existing:
+            continue
+        # duplicates inside the batch itself
+        existing.add((emp.name, r["timestamp"]))
+
+        rows.append({
+            "employee": emp.name,
+            "employee_name": emp.employee_name,
+            "time": r["timestamp"],
+            "log_type": "IN" if r["punch"] in [0, 4] else "OUT",
+            "device_id": r["user_id"],
+            "device_ip": r.get("device_ip"),
+            "latitude": "0.0",
+            "longitude": "0.0",
+        })
+
+    stats = insert_checkins(rows, bulk=bulk)
+    stats.skipped += len(records) - len(rows)
+    stats.unmatched = len(records) - len(matched)
+    return stats
+
+
+def _empty_stats():
+    # first_failed: time of the earliest punch that failed to insert (sync cursors stop before it)
+    return frappe._dict({
+        "created": 0, "skipped": 0, "failed": 0, "unmatched": 0, "first_failed": None,
+        "elapsed": 0.0, "rows_per_sec": 0.0
+    })
+
+
+def _add_stats(total, stats):
+    for key in ("created", "skipped", "failed", "unmatched", "elapsed"):
+        total[key] += stats.get(key) or 0
+    _note_failed(total, stats.get("first_failed"))
+    total.elapsed = round(total.elapsed, 3)
+    total.rows_per_sec = round(total.created / total.elapsed, 1) if total.elapsed else float(total.created)
+    return total
+
+
+def get_existing_checkin_keys(employees, timestamps):
+    """
+    (employee, "YYYY-MM-DD HH:MM:SS") keys of checkins already stored for these employees
+    inside the batch's time window. Served by the (employee, time) index.
+    """
+    if not employees or not timestamps:
+        return set()
+
+    times = [get_datetime(t) for t in timestamps]
+    return {
         (c.employee, c.time.strftime("%Y-%m-%d %H:%M:%S"))
-        for c in frappe.get_all("Employee Checkin",
-            filters={"time": ["in", timestamps]}, fields=["employee", "time"]
+        for c in frappe.get_all(
+            "Employee Checkin",
+            filters={"employee": ["in", employees], "time": ["between", [min(times), max(times)]]},
+            fields=["employee", "time"]
         )
     }
 
-    for r in all_logs:
-        emp = emp_map.get(r["user_id"])
-        if not emp or (emp, r["timestamp"]) in existing:
-            continue
 
-        log_type = "IN" if r["punch"] in [0, 4] else "OUT"
-        try:
-            frappe.get_doc({
-                "doctype": "Employee Checkin",
-                "employee": emp,
-                "time": r["timestamp"],
-                "log_type": log_type,
-                "device_id": r["user_id"],
-                "device_ip": r.get("device_ip"),
-                "latitude": "0.0",
-                "longitude": "0.0",
-            }).insert(ignore_permissions=True)
-        except Exception as e:
-            frappe.log_error(f"Failed inserting checkin for {emp}: {e}", "Checkin Creation Error")
-
-    frappe.db.commit()
+def insert_checkins(rows, bulk=None):
+    """
+    Insert already validated checkin rows (dicts of Employee Checkin fields).
+    Bulk path: multi-row INSERTs of BULK_CHUNK_SIZE rows with one commit per chunk.
+    It skips the document lifecycle (validate/hooks), so shift fields are not filled.
+    A chunk that fails is rolled back and retried row by row with a normal insert.
+    Rows hitting the unique (employee, time, device_ip) key are skipped, not failed
+    (rows without a device_ip, e.g. file imports, are only deduplicated by the caller's lookup).
+    The (employee, date) pairs of the rows are queued for attendance recomputation.
+    """
+    started = time.monotonic()
+    stats = _empty_stats()
+    use_bulk = len(rows) >= BULK_THRESHOLD if bulk is None else bulk
+
+    if use_bulk:
+        columns = set(frappe.get_meta("Employee Checkin").get_valid_columns())
+        for i in range(0, len(rows), BULK_CHUNK_SIZE):
+            chunk = rows[i:i + BULK_CHUNK_SIZE]
+            try:
+                frappe.db.savepoint("checkin_bulk_chunk")
+                fields, values = _bulk_values(chunk, columns)
+                frappe.db.bulk_insert("Employee Checkin", fields, values, ignore_duplicates=True)
+                # rows hitting the unique key were ignored: count (and queue) only those stored
+                stored = set(frappe.get_all(
+                    "Employee Checkin", filters={"name": ["in", [v[0] for v in values]]}, pluck="name"
+                ))
+                inserted = [row for row, v in zip(chunk, values) if v[0] in stored]
+                # bulk rows skip doc_events, so queue their dates here
+                mark_attendance_dirty((row["employee"], row["time"]) for row in inserted)
+                stats.created += len(inserted)
+                stats.skipped += len(chunk) - len(inserted)
+            except Exception as e:
+                frappe.db.rollback(save_point="checkin_bulk_chunk")
+                frappe.log_error(f"Bulk checkin insert failed, retrying {len(chunk)} rows one by one: {e}", "Checkin Creation Error")
+                for row in chunk:
+                    _insert_checkin(row, stats)
+            frappe.db.commit()
+    else:
+        for row in rows:
+            _insert_checkin(row, stats)
+        frappe.db.commit()
+
+    stats.elapsed = round(time.monotonic() - started, 3)
+    stats.rows_per_sec = round(stats.created / stats.elapsed, 1) if stats.elapsed else float(stats.created)
+    if rows:
+        frappe.logger().info(
+            f"Employee Checkin ingest: {stats.created} created, {stats.failed} failed "
+            f"in {stats.elapsed}s ({stats.rows_per_sec} rows/s, bulk={use_bulk})"
+        )
+    return stats
+
+
+def _bulk_values(rows, columns):
+    """Build (fields, values) for frappe.db.bulk_insert, keeping only columns the table has."""
+    now = now_datetime()
+    user = frappe.session.user
+    names = reserve_names("Employee Checkin", len(rows))
+
+    fields = ["name", "owner", "creation", "modified", "modified_by", "docstatus"]
+    fields += [f for f in rows[0] if f in columns]
+    values = []
+    for name, row in zip(names, rows):
+        row = dict(row, time=get_datetime(row["time"]))
+        values.append([name, user, now, now, user, 0] + [row.get(f) for f in fields[6:]])
+    return fields, values
+
+
+def _insert_checkin(row, stats):
+    try:
+        frappe.db.savepoint("checkin_row")
+        frappe.get_doc({"doctype": "Employee Checkin", **row}).insert(ignore_permissions=True)
+        stats.created += 1
+    except (frappe.DuplicateEntryError, frappe.UniqueValidationError):
+        frappe.db.rollback(save_point="checkin_row")
+        stats.skipped += 1
+    except Exception as e:
+        frappe.db.rollback(save_point="checkin_row")
+        frappe.log_error(f"Failed inserting checkin for {row.get('employee')}: {e}", "Checkin Creation Error")
+        stats.failed += 1
+        _note_failed(stats, row.get("time"))
+
+
+def _note_failed(stats, punch_time):
+    if punch_time:
+        punch_time = get_datetime(punch_time)
+        if not stats.first_failed or punch_time < stats.first_failed:
+            stats.first_failed = punch_time
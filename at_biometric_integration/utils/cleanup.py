@@ -7,5 +7,5 @@ def cleanup_old_attendance_logs():
     today = datetime.now().strftime("%Y-%m-%d")
 
     for f in os.listdir(ATTENDANCE_DIR):
-        if f.endswith(".json") and today not in f:
+        if f.endswith((".json", ".jsonl")) and today not in f:
             os.remove(os.path.join(ATTENDANCE_DIR, f))
@@ -0,0 +1,285 @@
+"""
+Attendance Daily Fact: one materialized row per (employee, date) with an Attendance or checkins.
+It holds the first in / last out, the Attendance's own in / out time, the actual paired duration,
+the shift window, early/late and overtime minutes, holiday/weekend flags and the leave type, so the
+reports read one indexed table instead of rebuilding these from Attendance, Employee Checkin,
+Shift Type and Holiday on every run.
+
+Kept current incrementally:
+- process_attendance_realtime refreshes the pairs it drains from the Attendance Recompute Queue
+  (checkin changes and the bulk attendance writes, which skip doc_events)
+- Attendance doc_events collect changed pairs and refresh them once, right before the transaction commits
+- every refresh queues the monthly rollups (see monthly_rollup) of the closed months it touched
+"""
+from itertools import groupby
+
+import frappe
+from frappe.utils import add_days, get_datetime, get_first_day, getdate, now_datetime, nowdate
+
+from .attendance_metrics import MISSING, compute_metrics, to_seconds
+from .business_time import get_employee_holiday_list, is_weekly_off, is_working_day
+from .helpers import defer_until_commit, reserve_names, take_pending
+from .shift_cache import get_employee_profiles, get_shift_types
+
+FACT_DOCTYPE = "Attendance Daily Fact"
+FACT_BATCH_SIZE = 500          # rows per bulk insert / delete statement
+REBUILD_EMPLOYEE_CHUNK = 50    # employees per commit in rebuild_all_daily_facts
+DIRTY_FACTS_KEY = "at_biometric_dirty_facts"
+
+FACT_FIELDS = [
+    "employee", "employee_name", "attendance_date", "attendance", "status", "leave_type",
+    "company", "department", "is_weekend", "is_holiday",
+    "shift", "shift_start", "shift_end", "first_in", "last_out", "in_time", "out_time", "punch_count", "actual_seconds", "working_hours",
+    "early_entry_minutes", "late_entry_minutes", "early_going_minutes", "late_going_minutes", "overtime_minutes",
+]
+
+
+def get_checkin_index(employees, from_date=None, to_date=None):
+    """
+    All checkin times of `employees` (optionally between from_date and to_date), from one query
+    ordered by (employee, time) and grouped in a single streaming pass.
+    Returns {(employee, date): [times in order]}.
+    """
+    if not employees:
+        return {}
+
+    conditions, values = ["employee IN %(employees)s"], {"employees": list(employees)}
+    if from_date:
+        conditions.append("time >= %(from_time)s")
+        values["from_time"] = f"{getdate(from_date)} 00:00:00"
+    if to_date:
+        conditions.append("time < %(to_time)s")
+        values["to_time"] = f"{add_days(getdate(to_date), 1)} 00:00:00"
+
+    checkins = frappe.db.sql(f"""
+        SELECT employee, time
+        FROM `tabEmployee Checkin`
+        WHERE {" AND ".join(conditions)}
+        ORDER BY employee, time
+    """, values, as_iterator=True)
+
+    return {
+        key: [time for _, time in rows]
+        for key, rows in groupby(checkins, key=lambda c: (c[0], c[1].date()))
+    }
+
+
+def get_paired_seconds(times):
+    """Seconds worked from alternating IN/OUT checkins (1st-2nd, 3rd-4th, ...)."""
+    total = 0
+    for i in range(0, len(times) - 1, 2):
+        if times[i + 1] > times[i]:
+            total += (times[i + 1] - times[i]).total_seconds()
+    return int(total)
+
+
+def _date_filters(from_date, to_date):
+    if from_date and to_date:
+        return ["between", [getdate(from_date), getdate(to_date)]]
+    if from_date:
+        return [">=", getdate(from_date)]
+    if to_date:
+        return ["<=", getdate(to_date)]
+    return None
+
+
+def refresh_daily_facts(employees=None, from_date=None, to_date=None, pairs=None):
+    """
+    Recompute Attendance Daily Fact rows.
+    - `pairs`: exactly these (employee, date) pairs
+    - otherwise every date of `employees` between from_date and to_date (open ends allowed)
+    Facts of dates that no longer have an Attendance or checkins are removed. No commit here.
+    Returns the number of fact rows written.
+    """
+    if pairs is not None:
+        pairs = {(emp, getdate(d)) for emp, d in pairs if emp and d}
+        if not pairs:
+            return 0
+        employees = list({emp for emp, _ in pairs})
+        from_date, to_date = min(d for _, d in pairs), max(d for _, d in pairs)
+    if not employees:
+        return 0
+    employees = list(employees)
+
+    filters = {"employee": ["in", employees], "docstatus": ["<", 2]}
+    date_filter = _date_filters(from_date, to_date)
+    if date_filter:
+        filters["attendance_date"] = date_filter
+
+    attendance = {}
+    for a in frappe.get_all("Attendance", filters=filters, fields=[
+        "name", "employee", "attendance_date", "status", "leave_type", "shift",
+        "in_time", "out_time", "working_hours", "company", "department"
+    ], order_by="docstatus desc"):
+        attendance.setdefault((a.employee, getdate(a.attendance_date)), a)
+    checkins = get_checkin_index(employees, from_date, to_date)
+
+    keys = set(attendance) | set(checkins)
+    if pairs is not None:
+        keys &= pairs
+    keys = sorted(keys)
+
+    rows = _build_fact_rows(keys, attendance, checkins)
+    deleted = _delete_facts(employees, from_date, to_date, pairs)
+    _insert_facts(rows)
+    _mark_closed_month_rollups(set(keys) | deleted)
+    return len(rows)
+
+
+def _mark_closed_month_rollups(pairs):
+    """Rollups of closed months are built from these facts (draft attendance included): queue them."""
+    from .monthly_rollup import mark_rollups_dirty
+
+    this_month = get_first_day(nowdate())
+    mark_rollups_dirty((emp, day) for emp, day in pairs if day < this_month)
+
+
+def _build_fact_rows(keys, attendance, checkins):
+    if not keys:
+        return []
+
+    profiles = get_employee_profiles([emp for emp, _ in keys])
+    leaves = _get_leave_types(keys)
+
+    rows = []
+    for emp, day in keys:
+        profile = profiles.get(emp) or frappe._dict()
+        att = attendance.get((emp, day)) or frappe._dict()
+        times = checkins.get((emp, day), [])
+        holiday_list = get_employee_holiday_list(emp)
+        is_weekend = is_weekly_off(day, holiday_list)
+
+        rows.append(frappe._dict({
+            "employee": emp,
+            "employee_name": profile.employee_name,
+            "attendance_date": day,
+            "attendance": att.name,
+            "status": att.status,
+            "leave_type": att.leave_type or leaves.get((emp, day)),
+            "company": att.company or profile.company,
+            "department": att.department or profile.department,
+            "is_weekend": int(is_weekend),
+            "is_holiday": int(not is_weekend and not is_working_day(day, holiday_list)),
+            "shift": att.shift or profile.default_shift,
+            # like the summary report: Attendance in/out, first/last checkin when either is missing
+            "first_in": get_datetime(att.in_time) if att.in_time and att.out_time else (times[0] if times else None),
+            "last_out": get_datetime(att.out_time) if att.in_time and att.out_time else (times[-1] if times else None),
+            # as recorded on the Attendance (missed punch detection needs the gaps)
+            "in_time": get_datetime(att.in_time) if att.in_time else None,
+            "out_time": get_datetime(att.out_time) if att.out_time else None,
+            "punch_count": len(times),
+            "actual_seconds": get_paired_seconds(times),
+            "working_hours": att.working_hours or 0,
+        }))
+
+    shifts = get_shift_types([r.shift for r in rows])
+    for r in rows:
+        shift = shifts.get(r.shift)
+        r.shift_start = shift.start_time if shift else None
+        r.shift_end = shift.end_time if shift else None
+
+    metrics = compute_metrics(
+        [to_seconds(r.first_in) for r in rows],
+        [to_seconds(r.last_out) for r in rows],
+        [to_seconds(r.shift_start) for r in rows],
+        [to_seconds(r.shift_end) for r in rows],
+        [float(r.working_hours or 0) for r in rows],
+    )
+    for field, metric in (
+        ("early_entry_minutes", "early_entry"), ("late_entry_minutes", "late_entry"),
+        ("early_going_minutes", "early_going"), ("late_going_minutes", "late_going"),
+        ("overtime_minutes", "over_time"),
+    ):
+        for r, value in zip(rows, metrics[metric].tolist()):
+            r[field] = 0 if value == MISSING else value
+    return rows
+
+
+def _get_leave_types(keys):
+    """Leave type of approved Leave Applications covering the (employee, date) keys."""
+    employees = list({emp for emp, _ in keys})
+    from_date, to_date = min(d for _, d in keys), max(d for _, d in keys)
+    leaves = {}
+    for leave in frappe.get_all("Leave Application", filters={
+        "employee": ["in", employees],
+        "from_date": ["<=", to_date],
+        "to_date": [">=", from_date],
+        "status": "Approved"
+    }, fields=["employee", "leave_type", "from_date", "to_date"]):
+        day = max(getdate(leave.from_date), from_date)
+        while day <= min(getdate(leave.to_date), to_date):
+            leaves.setdefault((leave.employee, day), leave.leave_type)
+            day = add_days(day, 1)
+    return leaves
+
+
+def _delete_facts(employees, from_date, to_date, pairs=None):
+    filters = {"employee": ["in", employees]}
+    date_filter = _date_filters(from_date, to_date)
+    if date_filter:
+        filters["attendance_date"] = date_filter
+
+    facts = {
+        f.name: (f.employee, getdate(f.attendance_date))
+        for f in frappe.get_all(FACT_DOCTYPE, filters=filters, fields=["name", "employee", "attendance_date"])
+        if pairs is None or (f.employee, getdate(f.attendance_date)) in pairs
+    }
+    names = list(facts)
+    for i in range(0, len(names), FACT_BATCH_SIZE):
+        frappe.db.delete(FACT_DOCTYPE, {"name": ["in", names[i:i + FACT_BATCH_SIZE]]})
+    return set(facts.values())
+
+
+def _insert_facts(rows):
+    if not rows:
+        return
+    now = now_datetime()
+    user = frappe.session.user
+    names = reserve_names(FACT_DOCTYPE, len(rows))
+    frappe.db.bulk_insert(
+        FACT_DOCTYPE,
+        ["name", "owner", "creation", "modified", "modified_by", "docstatus"] + FACT_FIELDS,
+        [[name, user, now, now, user, 0] + [row.get(f) for f in FACT_FIELDS] for name, row in zip(names, rows)],
+        chunk_size=FACT_BATCH_SIZE
+    )
+
+
+def rebuild_all_daily_facts():
+    """Backfill / full rebuild of every employee's facts, REBUILD_EMPLOYEE_CHUNK employees per commit."""
+    employees = frappe.get_all("Employee", pluck="name")
+    for i in range(0, len(employees), REBUILD_EMPLOYEE_CHUNK):
+        chunk = employees[i:i + REBUILD_EMPLOYEE_CHUNK]
+        try:
+            refresh_daily_facts(employees=chunk)
+            frappe.db.commit()
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Daily fact rebuild failed for {len(chunk)} employees: {e}", "Attendance Daily Fact")
+
+
+# ------------------------
+# Attendance doc_events
+# ------------------------
+def mark_facts_dirty(pairs):
+    """Refresh the facts of the (employee, date) pairs once, right before the transaction commits."""
+    defer_until_commit(
+        DIRTY_FACTS_KEY, ((emp, getdate(d)) for emp, d in pairs if emp and d), _flush_dirty_facts
+    )
+
+
+def mark_attendance_fact_dirty(doc, method=None):
+    """doc_events hook on Attendance (update/submit/cancel/trash)."""
+    mark_facts_dirty([(doc.employee, doc.attendance_date)])
+
+
+def _flush_dirty_facts():
+    pairs = take_pending(DIRTY_FACTS_KEY)
+    if not pairs:
+        return
+    try:
+        frappe.db.savepoint("daily_facts")
+        refresh_daily_facts(pairs=pairs)
+    except Exception as e:
+        # never block the commit of the attendance itself
+        frappe.db.rollback(save_point="daily_facts")
+        frappe.log_error(f"Daily fact refresh failed for {len(pairs)} attendance dates: {e}", "Attendance Daily Fact")
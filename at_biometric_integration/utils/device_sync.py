@@ -0,0 +1,169 @@
+"""
+Device sync as background jobs: one RQ job per Biometric Device Settings on the "long" queue.
+- enqueue_device_syncs queues a job per device; the job_id is derived from the device name and
+  deduplicated, so a device never has two syncs queued or running at the same time
+- sync_device (the job) runs the pipeline's ingest stage for its device (see utils/pipeline), so
+  the run is timed and reported like the other stages; when it stored new checkins it queues the
+  downstream pipeline stages
+- sync_device_logs reads one device, stores its new logs, creates checkins and advances its
+  cursor, holding the device's named lock (see utils/locks) in case two jobs still overlap
+- get_device_sync_status (whitelisted) reports the RQ job state and the last run of each device
+"""
+import time
+
+import frappe
+from frappe.utils import now_datetime
+from frappe.utils.background_jobs import get_job_status, is_job_enqueued
+
+from . import biometric_sync, checkin_processing, locks
+
+DEVICE_SYNC_QUEUE = "long"
+DEVICE_SYNC_TIMEOUT = 1800       # seconds, RQ timeout of one device job
+LAST_RUN_KEY = "at_biometric_device_sync_last_run"
+DEVICE_FIELDS = [
+    "name", "device_ip", "device_port", "clear_from_device_on_fetch",
+    "last_synced_timestamp", "last_synced_uid", "last_device_record_count"
+]
+
+
+def get_device_job_id(device):
+    return f"at_biometric_device_sync::{device}"
+
+
+def enqueue_device_syncs(devices=None):
+    """
+    Queue one sync job per device (default: all). Devices whose previous job is still queued or
+    running are not queued again. Returns {"queued": [device, ...], "running": [device, ...]}.
+    """
+    if devices is None:
+        devices = frappe.get_all("Biometric Device Settings", pluck="name")
+
+    response = {"queued": [], "running": []}
+    for device in devices:
+        job_id = get_device_job_id(device)
+        if is_job_enqueued(job_id):
+            response["running"].append(device)
+            continue
+        frappe.enqueue(
+            "at_biometric_integration.utils.device_sync.sync_device",
+            queue=DEVICE_SYNC_QUEUE,
+            timeout=DEVICE_SYNC_TIMEOUT,
+            job_id=job_id,
+            deduplicate=True,
+            device=device
+        )
+        response["queued"].append(device)
+    return response
+
+
+def sync_device(device):
+    """Background job for one device: the pipeline's ingest stage, then the downstream stages when it stored checkins."""
+    from .pipeline import INGEST_STAGES, enqueue_downstream, run_pipeline
+
+    report = run_pipeline(INGEST_STAGES, devices=[device])
+    if (report.stages.get("ingest") or {}).get("checkins"):
+        enqueue_downstream()
+    return report
+
+
+def sync_device_logs(device):
+    """
+    Sync one device:
+    - fetch its logs (skipped when the record count did not change since the last run)
+    - process logs into checkins (bulk insert for large batches)
+    - advance the device's sync cursor
+    - clear the device buffer when "Clear From Device On Fetch" is set and the logs are verified as committed
+    The run report is kept for get_device_sync_status and returned (None when skipped because
+    another sync of the device holds its lock).
+    """
+    return locks.run_exclusive(f"device_sync:{device}", _sync_device, device).result
+
+
+def _sync_device(device):
+    device_doc = frappe.get_all("Biometric Device Settings", filters={"name": device}, fields=DEVICE_FIELDS)
+    if not device_doc:
+        return None
+
+    result = biometric_sync.fetch_from_device(device_doc[0])
+    ip = result.ip
+    report = frappe._dict({
+        "device": device,
+        "ip": ip,
+        "started_at": now_datetime(),
+        "fetch_seconds": result.elapsed,
+        "fetched": len(result.logs),
+        "record_count": result.record_count,
+        "unchanged": result.unchanged,
+        "new_records": 0,
+        "cleared": False,
+        "process_seconds": 0.0,
+        "error": result.error,
+        "message": None,
+    })
+
+    if result.error:
+        frappe.log_error(f"Error connecting to device {ip}: {result.error}", "Biometric Fetch Error")
+        report.message = f"Failed to fetch from {ip}: {result.error}"
+    elif result.unchanged:
+        report.message = f"No new logs for {ip} (record count unchanged)"
+    else:
+        started = time.monotonic()
+        try:
+            logs = biometric_sync.filter_logs_after_cursor(result.logs, result.device)
+            # every log after the cursor goes to checkin creation; the DB dedup skips those
+            # already stored, so logs of a rolled back or failed run are retried
+            records = biometric_sync.process_attendance_logs(ip, logs) if logs else []
+            report.new_records = len(records)
+            failed_since = None
+            if records:
+                stats = checkin_processing.create_frappe_attendance_multi([result.device], records=records)
+                report.checkins = stats
+                failed_since = stats.first_failed
+                report.message = (
+                    f"Synced {len(records)} records from {ip}. "
+                    f"Checkins created: {stats.created} ({stats.rows_per_sec} rows/s)"
+                    + (f", failed: {stats.failed}" if stats.failed else "")
+                )
+            else:
+                report.message = f"No new logs for {ip}"
+
+            # checkins are committed at this point; the cursor never moves past a failed punch
+            biometric_sync.update_sync_cursor(result.device, logs, result.record_count, failed_since=failed_since)
+            frappe.db.commit()
+
+            if result.device.clear_from_device_on_fetch:
+                report.cleared = biometric_sync.clear_device_logs(result.device, result.logs, result.record_count)
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Sync of device {ip} failed: {e}\n{frappe.get_traceback()}", "Biometric Sync Error")
+            report.error = str(e)
+            report.message = f"Failed to process logs from {ip}: {e}"
+        report.process_seconds = round(time.monotonic() - started, 3)
+
+    report.finished_at = now_datetime()
+    frappe.cache().hset(LAST_RUN_KEY, device, dict(report))
+    return report
+
+
+@frappe.whitelist()
+def get_device_sync_status():
+    """
+    Per device: the state of its sync job (queued / started / finished / failed / ..., None when
+    RQ no longer knows it) and the report of its last finished run.
+    """
+    frappe.has_permission("Biometric Device Settings", "read", throw=True)
+
+    status = []
+    for device in frappe.get_all("Biometric Device Settings", fields=["name", "device_ip"]):
+        job_status = get_job_status(get_device_job_id(device.name))
+        last_run = frappe.cache().hget(LAST_RUN_KEY, device.name) or {}
+        status.append({
+            "device": device.name,
+            "ip": device.device_ip,
+            "job_status": job_status.value if job_status else None,
+            "last_run": {
+                key: last_run.get(key)
+                for key in ("started_at", "finished_at", "new_records", "error", "message", "cleared")
+            } if last_run else None,
+        })
+    return status
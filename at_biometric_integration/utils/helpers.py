@@ -1,5 +1,5 @@
 import frappe
-from frappe.utils import get_datetime, time_diff_in_hours
+from frappe.utils import cint
 
 def get_leave_status(employee, date):
     leaves = frappe.get_all("Leave Application",
@@ -17,9 +17,62 @@ def is_holiday(employee, date):
     return frappe.db.exists("Holiday", {"parent": holiday_list, "holiday_date": date}) if holiday_list else False
 
 
-def calculate_working_hours(first, last):
-    try:
-        return time_diff_in_hours(get_datetime(last.time), get_datetime(first.time))
-    except Exception as e:
-        frappe.log_error(f"Working hours calc failed: {e}", "Working Hours Error")
-        return 0
+def reserve_names(doctype, count):
+    """
+    Reserve `count` document names for a bulk insert with a single update of the series counter.
+    Follows the doctype's naming series (autoname "PREFIX-.####" or "naming_series:");
+    doctypes not named by a series get random hashes.
+    """
+    from frappe.model.naming import parse_naming_series
+
+    if count <= 0:
+        return []
+
+    meta = frappe.get_meta(doctype)
+    series = meta.autoname or ""
+    if series.startswith("naming_series:"):
+        field = meta.get_field("naming_series")
+        series = (field.default or (field.options or "").split("\n")[0]) if field else ""
+        if series and "#" not in series:
+            series = f"{series.rstrip('.')}.#####"
+
+    prefix, _, hashes = series.rpartition(".")
+    if not prefix or not hashes or set(hashes) != {"#"}:
+        return [frappe.generate_hash(length=10) for _ in range(count)]
+
+    key = parse_naming_series(prefix)
+    current = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name`=%s FOR UPDATE", (key,))
+    if current and current[0][0] is not None:
+        start = cint(current[0][0])
+        frappe.db.sql("UPDATE `tabSeries` SET `current` = `current` + %s WHERE `name`=%s", (count, key))
+    else:
+        start = 0
+        frappe.db.sql("INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)", (key, count))
+
+    return [f"{key}{str(n).zfill(len(hashes))}" for n in range(start + 1, start + count + 1)]
+
+
+def defer_until_commit(key, items, flush):
+    """
+    Collect `items` in the set frappe.local.<key> and call flush() once, right before the
+    transaction commits (flush takes them with take_pending). A rollback discards them along
+    with the changes, so the next transaction registers anew.
+    """
+    items = set(items)
+    if not items:
+        return
+    pending = getattr(frappe.local, key, None)
+    if pending is None:
+        pending = set()
+        setattr(frappe.local, key, pending)
+    if not pending:
+        frappe.db.before_commit.add(flush)
+        frappe.db.after_rollback.add(lambda: setattr(frappe.local, key, set()))
+    pending.update(items)
+
+
+def take_pending(key):
+    """The items collected by defer_until_commit under `key`, clearing them."""
+    pending = getattr(frappe.local, key, None) or set()
+    setattr(frappe.local, key, set())
+    return pending
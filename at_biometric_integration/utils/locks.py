@@ -0,0 +1,243 @@
+"""
+Redis named locks for the scheduled pipeline stages, shared by every worker of the bench.
+- a lock is a key set with NX and a TTL, holding a token unique to its holder; release and
+  extension compare the token first (Lua), so a holder never frees a lock it no longer owns
+- while held, a heartbeat thread keeps extending the TTL, so a long run keeps its lock and a
+  crashed worker's lock expires after at most the TTL
+- a run that finds the lock taken is skipped; with coalesce=True it also asks the holder to run
+  once more when it finishes, so the skipped work is picked up without piling up runs
+- locks are reentrant inside one process (a stage calling another stage under the same lock)
+- per-lock counters (runs, skipped, coalesced, lost) and the current holder are exposed by
+  get_lock_metrics
+"""
+import functools, os, socket, threading, time
+
+import frappe
+import redis
+from frappe.utils import now_datetime
+
+DEFAULT_LOCK_TTL = 300           # seconds; the heartbeat extends it every TTL / 3 while held
+MAX_COALESCED_RERUNS = 3         # follow-up runs one holder does for coalesced requests
+
+ATTENDANCE_LOCK = "attendance"   # every stage writing Attendance (build, auto-submit)
+REGULARIZATION_LOCK = "regularization_notifications"
+
+LOCK_KEY = "at_biometric_lock:{}"
+RERUN_KEY = "at_biometric_lock_rerun:{}"
+METRICS_KEY = "at_biometric_lock_metrics:{}"
+LOCK_NAMES_KEY = "at_biometric_lock_names"
+
+_EXTEND = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _redis():
+    """
+    A plain client on the site cache's connection pool, and the site key prefixer.
+    (frappe.cache() pickles hash/set values, these keys hold raw tokens and counters.)
+    """
+    cache = frappe.cache()
+    return redis.Redis(connection_pool=cache.connection_pool), cache.make_key
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _held():
+    held = getattr(frappe.local, "at_biometric_locks", None)
+    if held is None:
+        held = frappe.local.at_biometric_locks = {}
+    return held
+
+
+class NamedLock:
+    """A Redis lock with TTL and heartbeat. Use as a context manager and check `acquired`."""
+
+    def __init__(self, name, ttl=DEFAULT_LOCK_TTL):
+        self.name = name
+        self.ttl = int(ttl)
+        self.client, self.make_key = _redis()
+        self.key = self.make_key(LOCK_KEY.format(name))
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{frappe.generate_hash(length=8)}"
+        self.acquired = False
+        self.reentered = False
+        self.lost = False
+        self._stop = None
+
+    def acquire(self):
+        held = _held()
+        if self.name in held:
+            held[self.name] += 1
+            self.acquired = self.reentered = True
+            return True
+
+        if not self.client.set(self.key, self.token, nx=True, ex=self.ttl):
+            return False
+        held[self.name] = 1
+        self.acquired = True
+        self._start_heartbeat()
+        return True
+
+    def release(self):
+        if not self.acquired:
+            return
+        self.acquired = False
+        held = _held()
+        held[self.name] -= 1
+        if held[self.name] > 0:
+            return
+        del held[self.name]
+
+        if self._stop:
+            self._stop.set()
+        if not self.client.eval(_RELEASE, 1, self.key, self.token):
+            self.lost = True
+
+    def _start_heartbeat(self):
+        self._stop = threading.Event()
+        interval = max(self.ttl / 3, 1)
+        # the thread gets its own references: frappe.local is not shared with threads
+        client, key, token, ttl_ms, stop = self.client, self.key, self.token, self.ttl * 1000, self._stop
+
+        def beat():
+            while not stop.wait(interval):
+                try:
+                    if not client.eval(_EXTEND, 1, key, token, ttl_ms):
+                        self.lost = True
+                        return
+                except Exception:
+                    # transient Redis error, retried on the next beat while the TTL still runs
+                    continue
+
+        threading.Thread(target=beat, name=f"lock-heartbeat-{self.name}", daemon=True).start()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+def run_exclusive(name, fn, *args, ttl=DEFAULT_LOCK_TTL, coalesce=False, **kwargs):
+    """
+    Run fn(*args, **kwargs) holding the named lock.
+    Returns {ran, coalesced, result}: ran is False when another run held the lock (and, with
+    coalesce=True, that run was asked to go once more after it finishes).
+    """
+    outcome = frappe._dict({"ran": False, "coalesced": False, "result": None})
+    runs = 0
+    while True:
+        with NamedLock(name, ttl=ttl) as lock:
+            if not lock.acquired:
+                if not outcome.ran:
+                    if coalesce:
+                        request_rerun(name, ttl)
+                    outcome.coalesced = coalesce
+                    _record_skip(name, coalesce)
+                # otherwise a run that took the lock after ours covers the pending request
+                return outcome
+
+            if lock.reentered:
+                outcome.update({"ran": True, "result": fn(*args, **kwargs)})
+                return outcome
+
+            rerun_key = lock.make_key(RERUN_KEY.format(name))
+            while True:
+                # this run covers every request made before it started
+                lock.client.delete(rerun_key)
+                started = time.monotonic()
+                try:
+                    outcome.result = fn(*args, **kwargs)
+                finally:
+                    _record_run(name, time.monotonic() - started)
+                outcome.ran = True
+                runs += 1
+                if not coalesce or runs > MAX_COALESCED_RERUNS or not lock.client.exists(rerun_key):
+                    break
+                frappe.logger().info(f"Lock {name}: running again for a coalesced request")
+
+        if lock.lost:
+            _incr(name, "lost")
+            frappe.log_error(f"Lock {name} expired while its run was still going", "Pipeline Lock Lost")
+        # a request made between the last check and the release found the lock still held:
+        # take the lock again for it
+        if not coalesce or runs > MAX_COALESCED_RERUNS or not lock.client.exists(rerun_key):
+            return outcome
+        frappe.logger().info(f"Lock {name}: running again for a request made while releasing")
+
+
+def request_rerun(name, ttl=DEFAULT_LOCK_TTL):
+    """Ask the current holder of a coalescing lock to run once more when it finishes."""
+    client, make_key = _redis()
+    client.set(make_key(RERUN_KEY.format(name)), 1, ex=int(ttl))
+
+
+def exclusive(name, ttl=DEFAULT_LOCK_TTL, coalesce=False):
+    """Decorator form of run_exclusive for scheduler entry points; returns None when skipped."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return run_exclusive(name, fn, *args, ttl=ttl, coalesce=coalesce, **kwargs).result
+        return wrapper
+    return decorator
+
+
+# ------------------------
+# Metrics
+# ------------------------
+def _incr(name, counter, by=1):
+    client, make_key = _redis()
+    client.sadd(make_key(LOCK_NAMES_KEY), name)
+    return client.hincrby(make_key(METRICS_KEY.format(name)), counter, by)
+
+
+def _record_run(name, elapsed):
+    _incr(name, "runs")
+    client, make_key = _redis()
+    client.hset(make_key(METRICS_KEY.format(name)), mapping={
+        "last_run_at": str(now_datetime()), "last_duration": round(elapsed, 3)
+    })
+
+
+def _record_skip(name, coalesced):
+    _incr(name, "coalesced" if coalesced else "skipped")
+    client, make_key = _redis()
+    client.hset(make_key(METRICS_KEY.format(name)), "last_skipped_at", str(now_datetime()))
+    frappe.logger().info(f"Lock {name} is held by another run: {'coalesced' if coalesced else 'skipped'}")
+
+
+@frappe.whitelist()
+def get_lock_metrics():
+    """Per pipeline lock: run / skipped / coalesced / lost counters, last run and the current holder."""
+    frappe.only_for("System Manager")
+
+    client, make_key = _redis()
+    metrics = {}
+    for name in sorted(_text(n) for n in client.smembers(make_key(LOCK_NAMES_KEY))):
+        values = {_text(k): _text(v) for k, v in client.hgetall(make_key(METRICS_KEY.format(name))).items()}
+        holder = _text(client.get(make_key(LOCK_KEY.format(name))))
+        metrics[name] = {
+            "runs": int(values.get("runs", 0)),
+            "skipped": int(values.get("skipped", 0)),
+            "coalesced": int(values.get("coalesced", 0)),
+            "lost": int(values.get("lost", 0)),
+            "last_run_at": values.get("last_run_at"),
+            "last_duration": float(values.get("last_duration") or 0),
+            "last_skipped_at": values.get("last_skipped_at"),
+            "held_by": holder,
+            "ttl": client.ttl(make_key(LOCK_KEY.format(name))) if holder else None,
+        }
+    return metrics
@@ -0,0 +1,116 @@
+"""
+Append-only raw punch store.
+One line-delimited JSON file per device per day: attendance_<ip>_<date>.jsonl
+- appends are written in a single write under an exclusive flock and fsync'd
+- readers take a shared flock and only yield complete lines
+- a per-process dedup index remembers how far each file was read, so an append
+  only parses the lines other workers wrote since the last call
+"""
+import fcntl, json, os
+import frappe
+from frappe.utils import getdate, nowdate
+
+STORE_NAME = "attendance_logs"
+
+# path -> {offset, seen}: bytes of the file already indexed and the (user_id, timestamp) keys seen in them
+_indexes = {}
+
+
+def get_store_dir():
+    return frappe.get_site_path("public", "files", STORE_NAME)
+
+
+def get_store_path(ip, date=None):
+    date_str = getdate(date or nowdate()).strftime("%Y-%m-%d")
+    return os.path.join(get_store_dir(), f"attendance_{ip}_{date_str}.jsonl")
+
+
+def record_key(record):
+    return (str(record["user_id"]), record["timestamp"])
+
+
+def _read_lines(f, offset):
+    """Parse the complete lines after `offset`. Returns (records, offset past the last complete line)."""
+    f.seek(offset)
+    records = []
+    for line in f:
+        if not line.endswith(b"\n"):
+            # partial line from a writer that died mid-write
+            break
+        offset += len(line)
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records, offset
+
+
+def _refresh_index(path, f):
+    index = _indexes.get(path)
+    size = os.fstat(f.fileno()).st_size
+    if index is None or size < index.offset:
+        # drop indexes of files removed by cleanup
+        for p in [p for p in _indexes if not os.path.exists(p)]:
+            del _indexes[p]
+        index = _indexes[path] = frappe._dict({"offset": 0, "seen": set()})
+    if size > index.offset:
+        records, index.offset = _read_lines(f, index.offset)
+        index.seen.update(record_key(r) for r in records)
+    return index
+
+
+def append_records(ip, records):
+    """Append records not already in today's store for this device. Returns the appended records."""
+    if not records:
+        return []
+
+    os.makedirs(get_store_dir(), exist_ok=True)
+    path = get_store_path(ip)
+    with open(path, "ab+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            index = _refresh_index(path, f)
+            new_records = []
+            for record in records:
+                key = record_key(record)
+                if key in index.seen:
+                    continue
+                index.seen.add(key)
+                new_records.append(record)
+
+            if new_records:
+                payload = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in new_records).encode()
+                f.seek(0, os.SEEK_END)
+                if f.tell() > index.offset:
+                    # terminate a partial line so it cannot corrupt the first appended record
+                    payload = b"\n" + payload
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+                index.offset = f.tell()
+            return new_records
+        except Exception:
+            _indexes.pop(path, None)
+            raise
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def iter_records(ip, date=None):
+    """Yield the records stored for a device on a date (default today)."""
+    path = get_store_path(ip, date)
+    if not os.path.exists(path):
+        return
+
+    with open(path, "rb") as f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+        try:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
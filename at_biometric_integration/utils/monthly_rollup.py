@@ -0,0 +1,410 @@
+"""
+Attendance Monthly Rollup: the Monthly Attendance Summary row of one employee for one calendar month
+(present / half day / leave / LOP / WFH / absent counts, payment days, earned leave), stored so payroll
+re-running the report for a closed month reads one row per employee instead of rescanning the month.
+
+- compute_monthly_summary is the report's computation; the report and the rollups share it
+- Attendance (submit/cancel/amend), Leave Application and Leave Allocation doc_events, and every
+  daily fact refresh touching a closed month (drafts and bulk attendance writes included), collect
+  the changed (employee, month) pairs and refresh them once, right before the transaction commits
+- build_closed_month_rollups (monthly) snapshots the month that just closed for every active employee
+- get_monthly_summary serves a whole closed month from the rollups and computes anything else live
+"""
+from datetime import timedelta
+
+import frappe
+from frappe.utils import add_months, get_first_day, get_last_day, getdate, now_datetime, nowdate
+
+from .daily_facts import _flush_dirty_facts
+from .helpers import defer_until_commit, reserve_names, take_pending
+
+ROLLUP_DOCTYPE = "Attendance Monthly Rollup"
+ROLLUP_BATCH_SIZE = 500          # rows per bulk insert / delete statement
+REBUILD_EMPLOYEE_CHUNK = 500     # employees per commit in rebuild_monthly_rollups
+DIRTY_ROLLUPS_KEY = "at_biometric_dirty_rollups"
+
+ROLLUP_FIELDS = [
+    "employee", "employee_name", "month_start", "has_attendance",
+    "present", "leave", "lop", "absent", "half_day", "wfh", "no_of_weekends", "no_of_holidays",
+    "total_absent", "total_working_days", "payment_days", "earned_leave_taken", "earned_leave_balance",
+]
+
+
+def get_holiday_calendars(holiday_lists, all_dates, weekend_dates):
+    """
+    Holidays (weekends excluded) and working days of each holiday list over all_dates,
+    loaded with one Holiday query. The None key is the calendar of employees without a list.
+    """
+    holiday_lists = [hl for hl in holiday_lists if hl]
+    holidays_by_list = {hl: set() for hl in holiday_lists}
+    if holiday_lists and all_dates:
+        for h in frappe.get_all("Holiday", fields=["parent", "holiday_date"], filters={
+            "parent": ["in", holiday_lists],
+            "holiday_date": ["between", [all_dates[0], all_dates[-1]]]
+        }):
+            holidays_by_list[h.parent].add(getdate(h.holiday_date))
+
+    date_set = set(all_dates)
+    calendars = {None: frappe._dict({"holidays": set(), "working_days": date_set - weekend_dates})}
+    for hl, holiday_dates in holidays_by_list.items():
+        final_holidays = holiday_dates - weekend_dates
+        calendars[hl] = frappe._dict({
+            "holidays": final_holidays,
+            "working_days": date_set - weekend_dates - final_holidays,
+        })
+    return calendars
+
+
+def compute_monthly_summary(employees, from_date, to_date):
+    """
+    Summary rows of `employees` (dicts with name, employee_name, holiday_list) between from_date
+    and to_date, computed from Attendance Daily Fact, Leave Application / Allocation and Holiday.
+    Returns {employee: row} with unformatted numbers; has_attendance is set when the employee
+    has any attendance status in the range.
+    """
+    if not employees:
+        return {}
+
+    # daily statuses from the materialized facts (see utils/daily_facts)
+    try:
+        attendance = frappe.db.sql("""
+            SELECT employee, attendance_date, status, leave_type
+            FROM `tabAttendance Daily Fact`
+            WHERE attendance_date BETWEEN %s AND %s
+            AND attendance IS NOT NULL
+            AND employee IN %s
+        """, (from_date, to_date, tuple(emp.name for emp in employees)), as_dict=True)
+    except Exception as e:
+        frappe.throw(f"Error fetching attendance data: {e}")
+
+    attendance_map = {}
+    for att in attendance:
+        attendance_map.setdefault(att.employee, {})[att.attendance_date] = att
+
+    # Earned leave types
+    try:
+        earned_leave_types = [lt.name for lt in frappe.get_all("Leave Type", filters={"is_earned_leave": 1})]
+    except Exception as e:
+        frappe.throw(f"Error fetching leave types: {e}")
+    if not earned_leave_types:
+        earned_leave_types = [""]
+
+    # LOP leave types
+    try:
+        lop_leave_types = [lt.name for lt in frappe.get_all("Leave Type", filters={"is_lwp": 1})]
+    except Exception as e:
+        frappe.throw(f"Error fetching LOP leave types: {e}")
+    if not lop_leave_types:
+        lop_leave_types = [""]
+
+    # Earned leave taken
+    try:
+        leave_applications = frappe.db.sql("""
+            SELECT employee, SUM(total_leave_days) as total_leave_days
+            FROM `tabLeave Application`
+            WHERE status = 'Approved'
+            AND leave_type IN %(earned_leave_types)s
+            AND from_date <= %(to_date)s
+            AND to_date >= %(from_date)s
+            GROUP BY employee
+        """, {
+            "earned_leave_types": tuple(earned_leave_types),
+            "from_date": from_date,
+            "to_date": to_date
+        }, as_dict=True)
+    except Exception as e:
+        frappe.throw(f"Error fetching leave applications: {e}")
+
+    # LOP leave taken
+    try:
+        lop_leave_applications = frappe.db.sql("""
+            SELECT employee, SUM(total_leave_days) as total_leave_days
+            FROM `tabLeave Application`
+            WHERE status = 'Approved'
+            AND leave_type IN %(lop_leave_types)s
+            AND from_date <= %(to_date)s
+            AND to_date >= %(from_date)s
+            GROUP BY employee
+        """, {
+            "lop_leave_types": tuple(lop_leave_types),
+            "from_date": from_date,
+            "to_date": to_date
+        }, as_dict=True)
+    except Exception as e:
+        frappe.throw(f"Error fetching LOP leave applications: {e}")
+
+    # Earned leave allocations
+    try:
+        leave_allocations = frappe.db.sql("""
+            SELECT employee, SUM(total_leaves_allocated) as total_allocated
+            FROM `tabLeave Allocation`
+            WHERE leave_type IN %(earned_leave_types)s
+            AND from_date <= %(to_date)s
+            AND to_date >= %(from_date)s
+            GROUP BY employee
+        """, {
+            "earned_leave_types": tuple(earned_leave_types),
+            "from_date": from_date,
+            "to_date": to_date
+        }, as_dict=True)
+    except Exception as e:
+        frappe.throw(f"Error fetching leave allocations: {e}")
+
+    # per-employee totals (grouped in SQL), so each employee is a single lookup
+    earned_leave_taken_map = {la.employee: la.total_leave_days for la in leave_applications}
+    lop_leave_taken_map = {la.employee: la.total_leave_days for la in lop_leave_applications}
+    leave_allocation_map = {alloc.employee: alloc.total_allocated for alloc in leave_allocations}
+
+    all_dates = [from_date + timedelta(days=i) for i in range((to_date - from_date).days + 1)]
+    weekend_dates = set(d for d in all_dates if d.weekday() in [5, 6])
+
+    # one Holiday query for every distinct holiday list, working days precomputed per list
+    try:
+        holiday_calendars = get_holiday_calendars(
+            {emp.holiday_list for emp in employees}, all_dates, weekend_dates
+        )
+    except Exception as e:
+        frappe.throw(f"Error fetching holidays: {e}")
+
+    rows = {}
+    for emp in employees:
+        emp_attendance = attendance_map.get(emp.name, {})
+        holiday_calendar = holiday_calendars[emp.holiday_list or None]
+        final_holidays = holiday_calendar.holidays
+        valid_working_days = holiday_calendar.working_days
+
+        present = leave = absent = half_day = wfh = lop = 0
+
+        for date in all_dates:
+            record = emp_attendance.get(date)
+            if date in valid_working_days:
+                if record:
+                    status = record.status
+                    leave_type = record.leave_type
+                    if status == "Present":
+                        present += 1
+                    elif status == "On Leave":
+                        if leave_type in lop_leave_types:
+                            lop += 1
+                        else:
+                            leave += 1
+                    elif status == "Half Day":
+                        half_day += 1
+                    elif status == "Work From Home":
+                        wfh += 1
+                    elif status == "Absent":
+                        absent += 1
+                else:
+                    absent += 1
+
+        earned_leave_taken = earned_leave_taken_map.get(emp.name) or 0
+        total_allocated = leave_allocation_map.get(emp.name) or 0
+        earned_leave_balance = total_allocated - earned_leave_taken
+
+        lop_leave_taken = lop_leave_taken_map.get(emp.name) or 0
+
+        rows[emp.name] = frappe._dict({
+            "employee": emp.name,
+            "employee_name": emp.employee_name,
+            "has_attendance": int(present + leave + absent + half_day + wfh + lop > 0),
+            "present": present,
+            "leave": leave,
+            "lop": lop + lop_leave_taken,  # Add LOP from attendance and leave applications
+            "absent": absent,
+            "half_day": half_day,
+            "wfh": wfh,
+            "no_of_weekends": len(weekend_dates),
+            "no_of_holidays": len(final_holidays),
+            "total_absent": absent + leave + (half_day / 2) + lop + lop_leave_taken,
+            "total_working_days": present + (half_day / 2),
+            "payment_days": leave + len(final_holidays) + len(weekend_dates) + absent + present + (half_day / 2) + wfh,
+            "earned_leave_taken": earned_leave_taken,
+            "earned_leave_balance": earned_leave_balance,
+        })
+    return rows
+
+
+def is_closed_month(from_date, to_date):
+    """Whether the range is exactly one calendar month that ended before the current month."""
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    return (
+        from_date == get_first_day(from_date)
+        and to_date == get_last_day(from_date)
+        and to_date < get_first_day(nowdate())
+    )
+
+
+def get_monthly_summary(employees, from_date, to_date):
+    """
+    Summary rows of `employees` in their order. A whole closed month is read from the rollups;
+    employees without a rollup (and any other range) are computed live. Never writes.
+    """
+    rows = {}
+    if is_closed_month(from_date, to_date):
+        filters = {"month_start": getdate(from_date)}
+        if len(employees) == 1:
+            filters["employee"] = employees[0].name
+        wanted = {emp.name for emp in employees}
+        rows = {
+            r.employee: r
+            for r in frappe.get_all(ROLLUP_DOCTYPE, filters=filters, fields=ROLLUP_FIELDS)
+            if r.employee in wanted
+        }
+
+    missing = [emp for emp in employees if emp.name not in rows]
+    if missing:
+        rows.update(compute_monthly_summary(missing, from_date, to_date))
+
+    summary = []
+    for emp in employees:
+        row = rows[emp.name]
+        row.employee_name = emp.employee_name
+        summary.append(row)
+    return summary
+
+
+def refresh_monthly_rollups(pairs):
+    """
+    Recompute the rollups of the (employee, month_start) pairs. No commit here.
+    Returns the number of rollup rows written.
+    """
+    by_month = {}
+    for emp, month_start in pairs:
+        if emp and month_start:
+            by_month.setdefault(get_first_day(month_start), set()).add(emp)
+
+    written = 0
+    for month_start, month_employees in sorted(by_month.items()):
+        employees = frappe.get_all(
+            "Employee", filters={"name": ["in", list(month_employees)]},
+            fields=["name", "employee_name", "holiday_list"]
+        )
+        rows = compute_monthly_summary(employees, month_start, get_last_day(month_start))
+        _delete_rollups(list(month_employees), month_start)
+        _insert_rollups(month_start, list(rows.values()))
+        written += len(rows)
+    return written
+
+
+def _delete_rollups(employees, month_start):
+    names = frappe.get_all(
+        ROLLUP_DOCTYPE, filters={"employee": ["in", employees], "month_start": month_start}, pluck="name"
+    )
+    for i in range(0, len(names), ROLLUP_BATCH_SIZE):
+        frappe.db.delete(ROLLUP_DOCTYPE, {"name": ["in", names[i:i + ROLLUP_BATCH_SIZE]]})
+
+
+def _insert_rollups(month_start, rows):
+    if not rows:
+        return
+    now = now_datetime()
+    user = frappe.session.user
+    names = reserve_names(ROLLUP_DOCTYPE, len(rows))
+    frappe.db.bulk_insert(
+        ROLLUP_DOCTYPE,
+        ["name", "owner", "creation", "modified", "modified_by", "docstatus", "computed_on"] + ROLLUP_FIELDS,
+        [
+            [name, user, now, now, user, 0, now] + [month_start if f == "month_start" else row.get(f) for f in ROLLUP_FIELDS]
+            for name, row in zip(names, rows)
+        ],
+        chunk_size=ROLLUP_BATCH_SIZE
+    )
+
+
+def rebuild_monthly_rollups(month_start, employees=None):
+    """(Re)build one month's rollups for `employees` (default: all active), REBUILD_EMPLOYEE_CHUNK per commit."""
+    month_start = get_first_day(month_start)
+    if employees is None:
+        employees = frappe.get_all("Employee", filters={"status": "Active"}, pluck="name")
+    for i in range(0, len(employees), REBUILD_EMPLOYEE_CHUNK):
+        chunk = employees[i:i + REBUILD_EMPLOYEE_CHUNK]
+        try:
+            refresh_monthly_rollups((emp, month_start) for emp in chunk)
+            frappe.db.commit()
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(
+                f"Monthly rollup rebuild of {month_start} failed for {len(chunk)} employees: {e}",
+                "Attendance Monthly Rollup"
+            )
+
+
+def build_closed_month_rollups():
+    """Monthly job: snapshot the month that just closed for every active employee."""
+    rebuild_monthly_rollups(add_months(get_first_day(nowdate()), -1))
+
+
+# ------------------------
+# doc_events
+# ------------------------
+def _months_between(from_date, to_date):
+    month, last = get_first_day(from_date), get_first_day(to_date)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def mark_rollup_dirty(doc, method=None):
+    """
+    doc_events hook on Attendance (submit/cancel/update after submit), Leave Application and
+    Leave Allocation: remember the (employee, month) pairs and refresh them once, just before
+    the transaction commits.
+    """
+    if not doc.get("employee"):
+        return
+    if doc.get("attendance_date"):
+        months = [get_first_day(doc.attendance_date)]
+    elif doc.get("from_date") and doc.get("to_date"):
+        months = list(_months_between(doc.from_date, doc.to_date))
+    else:
+        return
+
+    mark_rollups_dirty((doc.employee, month) for month in months)
+
+
+def mark_rollups_dirty(pairs):
+    """Refresh the rollups of the (employee, month) pairs once, right before the transaction commits."""
+    defer_until_commit(
+        DIRTY_ROLLUPS_KEY, ((emp, get_first_day(m)) for emp, m in pairs if emp and m), _flush_dirty_rollups
+    )
+
+
+def _flush_dirty_rollups():
+    # rollups read the daily facts, so those of this transaction go first (queueing their months)
+    _flush_dirty_facts()
+    pairs = take_pending(DIRTY_ROLLUPS_KEY)
+    if not pairs:
+        return
+    try:
+        frappe.db.savepoint("monthly_rollups")
+        refresh_monthly_rollups(pairs)
+    except Exception as e:
+        # never block the commit of the attendance / leave itself
+        frappe.db.rollback(save_point="monthly_rollups")
+        frappe.log_error(f"Monthly rollup refresh failed for {len(pairs)} employee months: {e}", "Attendance Monthly Rollup")
+
+
+def refresh_holiday_list_rollups(doc, method=None):
+    """
+    doc_events hook on Holiday List update/trash: closed months of the list that already have
+    rollups are rebuilt in the background (holidays change the working-day counts).
+    """
+    if not doc.get("from_date") or not doc.get("to_date"):
+        return
+    last_closed = add_months(get_first_day(nowdate()), -1)
+    months = {
+        getdate(m) for m in frappe.get_all(
+            ROLLUP_DOCTYPE, filters={"month_start": ["between", [get_first_day(doc.from_date), last_closed]]},
+            pluck="month_start", distinct=True
+        )
+        if getdate(m) <= getdate(doc.to_date)
+    }
+    for month_start in sorted(months):
+        frappe.enqueue(
+            "at_biometric_integration.utils.monthly_rollup.rebuild_monthly_rollups",
+            queue="long",
+            month_start=month_start,
+            job_id=f"at_biometric_monthly_rollup::{month_start}",
+            deduplicate=True,
+            enqueue_after_commit=True
+        )
@@ -0,0 +1,176 @@
+"""
+The attendance pipeline: one staged flow from device punches to submitted Attendance.
+
+    ingest      device logs -> raw punch store -> Employee Checkin; every inserted checkin queues
+                its (employee, date) pair in Attendance Recompute Queue
+    attendance  drains the queue and upserts Attendance (and the daily facts) for just those pairs
+    submit      submits the attendances of this run that are already eligible, then any draft
+                whose auto-submit due time has passed
+
+Ingest runs as one deduplicated job per device (see device_sync), each a pipeline run of the
+ingest stage for that device; a device job that stored new checkins queues the downstream
+stages, so punches flow straight into attendance and submit.
+The scheduler runs ingest every 15 minutes and the downstream stages every 30 minutes
+(catching checkins entered by hand and due times passing without new punches).
+Downstream runs hold the attendance lock (see locks) and coalesce when one is already going.
+
+Each stage is a function taking the run context and returning its counters; run_pipeline times
+every stage and keeps the report of the last ingest and downstream run for get_last_pipeline_run.
+"""
+import time
+
+import frappe
+from frappe.utils import now_datetime
+from frappe.utils.background_jobs import get_job_status
+
+from . import attendance_processing, device_sync, locks
+
+DOWNSTREAM_JOB_ID = "at_biometric_pipeline_downstream"
+MAX_ATTENDANCE_ROUNDS = 10       # queue drains (RECOMPUTE_BATCH_SIZE pairs each) per run
+LAST_RUN_KEY = "at_biometric_pipeline_last_run"
+
+
+# ------------------------
+# Stages
+# ------------------------
+def ingest_stage(context):
+    """Sync the context's devices (each under its device lock)."""
+    counters = frappe._dict({"devices": 0, "new_records": 0, "checkins": 0, "errors": 0})
+    for device in context.devices or []:
+        report = device_sync.sync_device_logs(device)
+        if not report:
+            continue
+        counters.devices += 1
+        counters.new_records += report.new_records
+        counters.checkins += (report.get("checkins") or {}).get("created", 0)
+        counters.errors += int(bool(report.error))
+    return counters
+
+
+def attendance_stage(context):
+    """Upsert Attendance for the queued (employee, date) pairs, draining the queue in rounds."""
+    counters = frappe._dict({"rounds": 0, "upserted": 0, "failed": 0})
+    for _ in range(MAX_ATTENDANCE_ROUNDS):
+        if not frappe.db.count("Attendance Recompute Queue"):
+            break
+        changed = attendance_processing.process_attendance_realtime()
+        counters.rounds += 1
+        if changed is None:
+            # the round failed and left its pairs queued (logged there); retry on the next run
+            counters.failed += 1
+            break
+        # a round may drain pairs without changing any Attendance, keep going
+        counters.upserted += len(changed)
+        context.attendance.extend(changed)
+    return counters
+
+
+def submit_stage(context):
+    """Submit the eligible attendances of this run, then every draft that is due."""
+    counters = frappe._dict({"submitted_new": 0, "submitted_due": 0})
+    try:
+        counters.submitted_new = len(attendance_processing.auto_submit_new_attendances(context.attendance) or [])
+    except Exception as e:
+        frappe.log_error(f"Auto-submit of new attendance failed: {e}", "Attendance Pipeline")
+    counters.submitted_due = len(attendance_processing.auto_submit_due_attendances() or [])
+    return counters
+
+
+STAGES = {
+    "ingest": ingest_stage,
+    "attendance": attendance_stage,
+    "submit": submit_stage,
+}
+INGEST_STAGES = ("ingest",)
+DOWNSTREAM_STAGES = ("attendance", "submit")
+
+
+# ------------------------
+# Runner
+# ------------------------
+def run_pipeline(stages=tuple(STAGES), devices=None):
+    """
+    Run `stages` in order and return the run report:
+    {started_at, finished_at, stages: {name: {seconds, ...counters}}, attendance: [names], error}
+    A failing stage ends the run; the stages before it keep their committed work.
+    The attendance and submit stages run under the attendance lock (reentrant, so a caller may
+    already hold it); a stage finding it held by another run is skipped.
+    """
+    context = frappe._dict({"devices": devices or [], "attendance": []})
+    report = frappe._dict({"started_at": now_datetime(), "stages": {}, "error": None})
+
+    for name in stages:
+        started = time.monotonic()
+        try:
+            if name in DOWNSTREAM_STAGES:
+                outcome = locks.run_exclusive(locks.ATTENDANCE_LOCK, STAGES[name], context)
+                counters = outcome.result if outcome.ran else frappe._dict({"skipped": 1})
+            else:
+                counters = STAGES[name](context)
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Pipeline stage {name} failed: {e}\n{frappe.get_traceback()}", "Attendance Pipeline")
+            report.error = f"{name}: {e}"
+            counters = frappe._dict()
+        counters.seconds = round(time.monotonic() - started, 3)
+        report.stages[name] = counters
+        if report.error:
+            break
+
+    report.finished_at = now_datetime()
+    report.attendance = context.attendance
+    frappe.logger().info(
+        "Attendance pipeline: "
+        + ", ".join(f"{name} {counters.seconds}s" for name, counters in report.stages.items())
+        + (f" (failed in {report.error})" if report.error else "")
+    )
+    frappe.cache().hset(LAST_RUN_KEY, _run_kind(stages), {**report, "attendance": len(report.attendance)})
+    return report
+
+
+def _run_kind(stages):
+    return "ingest" if tuple(stages) == INGEST_STAGES else "downstream"
+
+
+def run_downstream():
+    """
+    Attendance -> submit for everything ingested so far (scheduler, device jobs, Mark Attendance).
+    Holds the attendance lock; returns None when another run held it (that run goes once more).
+    """
+    return locks.run_exclusive(locks.ATTENDANCE_LOCK, run_pipeline, DOWNSTREAM_STAGES, coalesce=True).result
+
+
+def enqueue_downstream():
+    """
+    Queue one downstream run on the long queue. A run already queued picks up the new pairs too;
+    a run already going is asked to go once more.
+    """
+    status = get_job_status(DOWNSTREAM_JOB_ID)
+    if status and status.value == "started":
+        locks.request_rerun(locks.ATTENDANCE_LOCK)
+        return
+    frappe.enqueue(
+        "at_biometric_integration.utils.pipeline.run_downstream",
+        queue=device_sync.DEVICE_SYNC_QUEUE,
+        job_id=DOWNSTREAM_JOB_ID,
+        deduplicate=True,
+        enqueue_after_commit=True
+    )
+
+
+def run_ingest():
+    """Scheduler entry: queue one ingest job per device (see device_sync.enqueue_device_syncs)."""
+    return device_sync.enqueue_device_syncs()
+
+
+@frappe.whitelist()
+def get_last_pipeline_run():
+    """
+    Reports of the last ingest (device job) and downstream pipeline runs (per-stage seconds and
+    counters) and the lock metrics.
+    """
+    frappe.only_for(["System Manager", "HR Manager"])
+    return {
+        "last_run": {kind: frappe.cache().hget(LAST_RUN_KEY, kind) for kind in ("ingest", "downstream")},
+        "locks": locks.get_lock_metrics() if "System Manager" in frappe.get_roles() else None,
+    }
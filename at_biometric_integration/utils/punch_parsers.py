@@ -0,0 +1,210 @@
+"""
+Streaming parsers for device export files. Every format yields normalized punch records,
+the same shape as the raw punch store (log_store):
+    {"user_id": "17", "timestamp": "YYYY-MM-DD HH:MM:SS", "punch": 0, "status": 1}
+- CSV / TXT exports, XLSX exports (openpyxl read-only mode) and legacy XLS exports (xlrd) with
+  the "No. / Date / Time / Employee ID / Punch State" table of the ZK tools
+- raw ZK attlog .dat files: one tab separated punch per line
+Files are read a line (row) at a time and records are handed out in fixed-size chunks,
+so memory stays flat whatever the file size.
+"""
+import csv, os
+from datetime import date, datetime, time
+
+import frappe
+
+PUNCH_CHUNK_SIZE = 2000          # records per chunk handed to the checkin creation path
+EXPORT_COLUMNS = ["Date", "Time", "Employee ID", "Punch State"]
+EXPORT_DATE_FORMATS = ["%d-%m-%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"]
+EXPORT_IN_STATE = "255"          # export Punch State of check-ins, anything else is a check-out
+PUNCH_IN, PUNCH_OUT = 0, 1       # zk punch codes (see biometric_sync.PUNCH_MAPPING)
+SUPPORTED_EXTENSIONS = (".csv", ".txt", ".xlsx", ".xls", ".dat")
+
+
+def iter_punch_chunks(path, chunk_size=PUNCH_CHUNK_SIZE, stats=None):
+    """
+    Yield (records, progress) with up to `chunk_size` normalized records per chunk and the
+    percentage of the file read so far. Lines that are not a valid punch are counted in
+    stats.invalid when a stats dict is given.
+    """
+    chunk, progress = [], 0.0
+    for record, progress in _iter_file(path, stats):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk, progress
+            chunk = []
+    if chunk:
+        yield chunk, progress
+
+
+def iter_chunks(records, chunk_size=PUNCH_CHUNK_SIZE):
+    """Group any record iterable into lists of at most chunk_size."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _iter_file(path, stats):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        frappe.throw(f"Unsupported file type {extension or '(none)'}: use a .csv, .xlsx, .xls or .dat export")
+    if extension == ".dat":
+        return _iter_attlog(path, stats)
+    readers = {".xlsx": _iter_xlsx_rows, ".xls": _iter_xls_rows}
+    return _iter_export(readers.get(extension, _iter_csv_rows)(path), stats)
+
+
+def _invalid(stats):
+    if stats is not None:
+        stats["invalid"] = stats.get("invalid", 0) + 1
+
+
+# ------------------------
+# ZK tool exports (CSV / XLSX)
+# ------------------------
+def _iter_export(rows, stats):
+    """Normalize the data rows of an export; lines before the header row (starting with "No") are skipped."""
+    headers = None
+    for values, progress in rows:
+        values = [_cell_text(v) for v in values]
+        if headers is None:
+            if values and values[0].startswith("No"):
+                headers = values
+                missing = [c for c in EXPORT_COLUMNS if c not in headers]
+                if missing:
+                    frappe.throw(f"Missing required columns: {', '.join(missing)}")
+            continue
+        if not any(values):
+            continue
+
+        row = dict(zip(headers, values))
+        timestamp = parse_punch_time(row.get("Date"), row.get("Time"))
+        if not row.get("Employee ID") or not timestamp:
+            _invalid(stats)
+            continue
+        yield {
+            "user_id": row["Employee ID"],
+            "timestamp": timestamp,
+            "punch": PUNCH_IN if row.get("Punch State") == EXPORT_IN_STATE else PUNCH_OUT,
+            "status": None,
+        }, progress
+
+    if headers is None:
+        frappe.throw('Could not find header row (must start with "No.")')
+
+
+def parse_punch_time(date_value, time_value):
+    """"YYYY-MM-DD HH:MM:SS" from an export's Date (DD-MM-YYYY) and Time columns, or None."""
+    if not date_value or not time_value:
+        return None
+    text = f"{date_value} {time_value}".strip()
+    for fmt in EXPORT_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    return None
+
+
+def _cell_text(value):
+    # XLSX cells may hold real dates / times
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d" if value.time() == time.min else "%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, time):
+        return value.strftime("%H:%M:%S")
+    return str(value).strip()
+
+
+def _iter_csv_rows(path):
+    # exports mix tab and comma separated lines (like the old browser parser, decide per line)
+    size = os.path.getsize(path) or 1
+    with open(path, "rb") as f:
+        for line in f:
+            text = line.decode("utf-8-sig", errors="replace").rstrip("\r\n")
+            values = next(csv.reader([text], delimiter="\t" if "\t" in text else ","), [])
+            yield values, round(f.tell() * 100 / size, 1)
+
+
+def _iter_xlsx_rows(path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total = sheet.max_row or 0
+        for i, values in enumerate(sheet.iter_rows(values_only=True), 1):
+            yield values, round(i * 100 / total, 1) if total else 0.0
+    finally:
+        workbook.close()
+
+
+def _iter_xls_rows(path):
+    # legacy .xls (BIFF) exports; xlrd loads the sheet whole, but the format caps it at 65536 rows
+    import xlrd
+
+    workbook = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheet = workbook.sheet_by_index(0)
+        for i in range(sheet.nrows):
+            values = [_xls_cell(cell, workbook.datemode) for cell in sheet.row(i)]
+            yield values, round((i + 1) * 100 / sheet.nrows, 1)
+    finally:
+        workbook.release_resources()
+
+
+def _xls_cell(cell, datemode):
+    import xlrd
+
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        value = xlrd.xldate_as_datetime(cell.value, datemode)
+        # a time-only cell is a fraction of a day
+        return value.time() if cell.value < 1 else value
+    if cell.ctype == xlrd.XL_CELL_NUMBER and float(cell.value).is_integer():
+        # numbers are floats in .xls: employee ID 17 reads as 17.0
+        return int(cell.value)
+    return cell.value
+
+
+# ------------------------
+# ZK attlog.dat
+# ------------------------
+def _iter_attlog(path, stats):
+    """
+    Raw attendance log downloaded from a ZK device (USB / attlog.dat):
+    user_id <TAB> YYYY-MM-DD HH:MM:SS <TAB> verify <TAB> in/out state <TAB> work code <TAB> reserved
+    """
+    size = os.path.getsize(path) or 1
+    with open(path, "rb") as f:
+        for line in f:
+            text = line.decode("utf-8", errors="replace").strip()
+            if not text:
+                continue
+            fields = [v.strip() for v in text.split("\t")]
+            if len(fields) < 2:
+                # some tools write spaces instead of tabs: user_id date time verify state ...
+                parts = text.split()
+                fields = parts[:1] + [" ".join(parts[1:3])] + parts[3:] if len(parts) >= 3 else []
+            try:
+                timestamp = datetime.strptime(fields[1], "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d %H:%M:%S")
+                record = {
+                    "user_id": fields[0],
+                    "timestamp": timestamp,
+                    "punch": int(fields[3]) if len(fields) > 3 and fields[3] else PUNCH_IN,
+                    "status": int(fields[2]) if len(fields) > 2 and fields[2] else None,
+                }
+            except (IndexError, ValueError):
+                _invalid(stats)
+                continue
+            if not record["user_id"]:
+                _invalid(stats)
+                continue
+            yield record, round(f.tell() * 100 / size, 1)
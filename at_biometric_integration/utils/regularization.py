@@ -0,0 +1,274 @@
+"""
+Attendance regularization eligibility.
+Shared by the Attendance Regularization Request report (a read-only view) and the
+scheduled notify_regularization_eligibility pass, which sends each notification once.
+"""
+import math
+import frappe
+from datetime import datetime, timedelta, time
+from frappe.utils import format_time, get_datetime, getdate, now_datetime
+
+from .business_time import get_employee_holiday_list, working_hours_between
+from .helpers import reserve_names
+from .locks import REGULARIZATION_LOCK, exclusive
+from .shift_cache import get_employee_profiles, get_shift_types
+
+NOTIFICATION_DOCTYPE = "Attendance Regularization Notification"
+DEFAULT_NOTIFICATION_TEMPLATE = "You are eligible for Attendance Regularization on {date}"
+HOLIDAY_LOOKBACK_DAYS = 7   # extra days read back for holidays inside the regularization window
+
+
+def get_regularization_settings():
+    settings = frappe.get_single("Attendance Settings") if frappe.db.exists("DocType", "Attendance Settings") else None
+    return frappe._dict({
+        "enable_feature": getattr(settings, "enable_regularization", True),
+        "min_delay_hours": int(getattr(settings, "regularization_from_hours", 24) or 24),
+        "max_delay_hours": int(getattr(settings, "regularization_to_hours", 48) or 48),
+        "max_requests_per_month": int(getattr(settings, "max_requests_per_month", 3) or 3),
+        "checkin_grace_start": int(getattr(settings, "checkin_grace_start_minutes", 60) or 60),
+        "checkout_grace_end": int(getattr(settings, "checkout_grace_end_minutes", 30) or 30),
+        "min_working_hours": float(getattr(settings, "min_working_hours", 8) or 8),
+        "enable_notifications": getattr(settings, "enable_notifications", True),
+        "notification_template": getattr(settings, "notification_message_template", None) or DEFAULT_NOTIFICATION_TEMPLATE,
+    })
+
+
+def load_eligibility_context(attendance_records):
+    """
+    Everything the eligibility check needs, loaded up front with grouped queries:
+    - profiles: employee profiles (name, default shift, user) from the shift cache
+    - shifts: the default Shift Types of those employees
+    - leave_days: (employee, date) pairs covered by an approved Leave Application
+    - regularization_counts: approved Attendance Regularizations per (employee, year, month)
+    """
+    employees = list({r.employee for r in attendance_records})
+    context = frappe._dict({"profiles": {}, "shifts": {}, "leave_days": set(), "regularization_counts": {}})
+    if not employees:
+        return context
+
+    dates = [getdate(r.attendance_date) for r in attendance_records]
+    from_date, to_date = min(dates), max(dates)
+
+    context.profiles = get_employee_profiles(employees)
+    context.shifts = get_shift_types([p.default_shift for p in context.profiles.values() if p])
+
+    for leave in frappe.get_all("Leave Application", filters={
+        "employee": ["in", employees],
+        "from_date": ["<=", to_date],
+        "to_date": [">=", from_date],
+        "status": "Approved"
+    }, fields=["employee", "from_date", "to_date"]):
+        day = max(getdate(leave.from_date), from_date)
+        while day <= min(getdate(leave.to_date), to_date):
+            context.leave_days.add((leave.employee, day))
+            day += timedelta(days=1)
+
+    month_start = from_date.replace(day=1)
+    month_end = (to_date.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    context.regularization_counts = {
+        (r.employee, r.year, r.month): r.count
+        for r in frappe.db.sql("""
+            SELECT employee, YEAR(`date`) AS year, MONTH(`date`) AS month, COUNT(*) AS count
+            FROM `tabAttendance Regularization`
+            WHERE employee IN %(employees)s
+                AND `date` BETWEEN %(month_start)s AND %(month_end)s
+                AND workflow_state = 'Approved'
+            GROUP BY employee, YEAR(`date`), MONTH(`date`)
+        """, {"employees": employees, "month_start": month_start, "month_end": month_end}, as_dict=True)
+    }
+    return context
+
+
+def evaluate_regularization(record, context, settings, now=None):
+    """
+    Regularization eligibility of one attendance record (name, employee, attendance_date,
+    in_time, out_time, working_hours, status), from the preloaded context. Makes no queries.
+    Returns {profile, attendance_date, shift_start, shift_end, in_time, out_time, missed_punch,
+    status, completed_requests, eligible, remarks}.
+    """
+    emp = record.employee
+    profile = context.profiles.get(emp) or frappe._dict()
+    att_date = getdate(record.attendance_date)
+    shift_start, shift_end = get_shift_window(context.shifts.get(profile.default_shift))
+
+    in_time = format_time_only(record.in_time)
+    out_time = format_time_only(record.out_time)
+
+    # Missed punch detection
+    missed_punch = "-"
+    if not in_time and not out_time:
+        missed_punch = "BOTH"
+    elif not in_time:
+        missed_punch = "IN"
+    elif not out_time:
+        missed_punch = "OUT"
+
+    status = record.status or ("Missed Punch" if missed_punch != "-" else "Present")
+    remarks = []
+    eligible = False
+
+    if not settings.enable_feature:
+        remarks.append("Regularization Disabled")
+
+    # Check for leave
+    has_leave = (emp, att_date) in context.leave_days
+
+    # Working hours (weekends and the employee's holidays excluded) since the attendance date
+    hours_passed = working_hours_between(
+        datetime.combine(att_date, time.min), now or datetime.now(), get_employee_holiday_list(emp)
+    )
+
+    # Monthly approved requests
+    completed_requests = context.regularization_counts.get((emp, att_date.year, att_date.month), 0)
+
+    # ---- Regularization Rules ----
+    if settings.enable_feature and not has_leave:
+        # (1) Within regularization time window
+        if settings.min_delay_hours <= hours_passed <= settings.max_delay_hours:
+            # (2) Missing check-in or out
+            if missed_punch in ["IN", "OUT", "BOTH"]:
+                eligible = True
+                remarks.append("Eligible: Missing check-in/out")
+            # (3) Working hours below threshold
+            elif record.working_hours and float(record.working_hours) < settings.min_working_hours:
+                eligible = True
+                remarks.append(f"Eligible: Working hours below {settings.min_working_hours} hours")
+            # (4) Grace time logic for check-in window
+            elif check_shift_checkin_grace(
+                record, shift_start, shift_end, settings.checkin_grace_start, settings.checkout_grace_end
+            ):
+                eligible = True
+                remarks.append("Eligible: Check-in missing within grace window")
+        else:
+            if hours_passed < settings.min_delay_hours:
+                remarks.append(f"Wait for {settings.min_delay_hours} hours to regularize")
+            elif hours_passed > settings.max_delay_hours:
+                remarks.append(f"{settings.max_delay_hours} hours exceeded - not allowed")
+
+        # Monthly limit
+        if completed_requests >= settings.max_requests_per_month:
+            remarks.append(f"Monthly limit reached ({settings.max_requests_per_month})")
+            eligible = False
+
+    return frappe._dict({
+        "profile": profile,
+        "attendance_date": att_date,
+        "shift_start": shift_start,
+        "shift_end": shift_end,
+        "in_time": in_time,
+        "out_time": out_time,
+        "missed_punch": missed_punch,
+        "status": status,
+        "completed_requests": completed_requests,
+        "eligible": eligible,
+        "remarks": remarks,
+    })
+
+
+def get_lookback_days(max_delay_hours):
+    """Calendar days back from today that can still be inside the regularization window."""
+    business_days = math.ceil(max_delay_hours / 24)
+    return business_days + 2 * (business_days // 5 + 1) + HOLIDAY_LOOKBACK_DAYS
+
+
+@exclusive(REGULARIZATION_LOCK)
+def notify_regularization_eligibility():
+    """
+    Scheduled pass: notify employees once for every attendance that became eligible for regularization.
+    - only attendances recent enough to still be inside the regularization window are read,
+      and pairs already in Attendance Regularization Notification are excluded in SQL
+    - sends are recorded first; the unique (employee, attendance_date) key keeps re-runs idempotent
+    - one realtime push per user with all of their new dates, sent after the commit
+    Returns the number of notifications recorded.
+    """
+    settings = get_regularization_settings()
+    if not settings.enable_feature or not settings.enable_notifications:
+        return 0
+
+    now = now_datetime()
+    records = frappe.db.sql(f"""
+        SELECT att.name, att.employee, att.attendance_date, att.in_time, att.out_time,
+            att.working_hours, att.status
+        FROM `tabAttendance` att
+        LEFT JOIN `tab{NOTIFICATION_DOCTYPE}` sent
+            ON sent.employee = att.employee AND sent.attendance_date = att.attendance_date
+        WHERE att.attendance_date BETWEEN %(from_date)s AND %(to_date)s
+            AND att.docstatus < 2
+            AND sent.name IS NULL
+    """, {
+        "from_date": getdate(now) - timedelta(days=get_lookback_days(settings.max_delay_hours)),
+        "to_date": getdate(now),
+    }, as_dict=True)
+    if not records:
+        return 0
+
+    context = load_eligibility_context(records)
+    eligible = []
+    for record in records:
+        result = evaluate_regularization(record, context, settings, now=now)
+        if result.eligible:
+            eligible.append((record, result))
+    if not eligible:
+        return 0
+
+    user = frappe.session.user
+    names = reserve_names(NOTIFICATION_DOCTYPE, len(eligible))
+    frappe.db.bulk_insert(NOTIFICATION_DOCTYPE, [
+        "name", "owner", "creation", "modified", "modified_by", "docstatus",
+        "employee", "employee_name", "attendance_date", "user", "sent_on", "reason"
+    ], [
+        [name, user, now, now, user, 0, record.employee, result.profile.employee_name,
+         result.attendance_date, result.profile.user_id, now, "; ".join(result.remarks)]
+        for name, (record, result) in zip(names, eligible)
+    ], ignore_duplicates=True)
+
+    # rows another run recorded meanwhile were ignored by the unique key: notify only for ours
+    stored = set(frappe.get_all(NOTIFICATION_DOCTYPE, filters={"name": ["in", names]}, pluck="name"))
+    sent = [item for name, item in zip(names, eligible) if name in stored]
+
+    messages = {}
+    for record, result in sent:
+        if result.profile.user_id:
+            messages.setdefault(result.profile.user_id, []).append(
+                settings.notification_template.format(date=result.attendance_date.strftime("%Y-%m-%d"))
+            )
+    for user_id, user_messages in messages.items():
+        frappe.publish_realtime(event="msgprint", message="<br>".join(user_messages), user=user_id, after_commit=True)
+
+    frappe.db.commit()
+    return len(sent)
+
+
+# ---------------- Helper Functions ----------------
+def get_shift_window(shift):
+    if shift:
+        return shift.start_time or "-", shift.end_time or "-"
+    return "-", "-"
+
+
+def format_time_only(dt_value):
+    if not dt_value:
+        return ""
+    try:
+        dt_obj = get_datetime(dt_value)
+        return format_time(dt_obj.time(), "HH:mm")
+    except Exception:
+        return str(dt_value)
+
+
+def check_shift_checkin_grace(record, shift_start, shift_end, grace_start, grace_end):
+    """Check if no check-in was found between (shift_start - grace_start) and (shift_end - grace_end)."""
+    if not shift_start or not shift_end:
+        return False
+    try:
+        if not record.in_time:
+            return True
+        in_dt = get_datetime(record.in_time)
+        shift_start_dt = datetime.combine(getdate(record.attendance_date), shift_start)
+        shift_end_dt = datetime.combine(getdate(record.attendance_date), shift_end)
+        if in_dt < (shift_start_dt + timedelta(minutes=grace_start)) or in_dt > (shift_end_dt - timedelta(minutes=grace_end)):
+            return True
+    except Exception:
+        pass
+    return False
+
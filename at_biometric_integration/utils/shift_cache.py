@@ -0,0 +1,94 @@
+"""
+Shift Type and Employee profile cache shared by attendance processing and the reports.
+Two levels:
+- request/job scoped dict on frappe.local (gone when the request ends)
+- Redis hash per doctype, evicted by the Shift Type / Employee doc_events below and expired as a
+  whole CACHE_TTL after its first entry, so changes that skip doc_events (and cached misses) do not
+  stay forever
+"""
+import frappe
+
+SHIFT_TYPE_KEY = "at_biometric_shift_type"
+EMPLOYEE_PROFILE_KEY = "at_biometric_employee_profile"
+CACHE_TTL = 3600       # seconds
+
+SHIFT_TYPE_FIELDS = ["name", "start_time", "end_time"]
+EMPLOYEE_PROFILE_FIELDS = [
+    "name", "employee_name", "default_shift", "holiday_list", "user_id", "company", "department", "status"
+]
+
+
+def _local(key):
+    store = getattr(frappe.local, "at_biometric_cache", None)
+    if store is None:
+        store = frappe.local.at_biometric_cache = {}
+    return store.setdefault(key, {})
+
+
+def _get_many(key, doctype, fields, names):
+    """Resolve names from the request cache, then Redis, then one DB query for the rest."""
+    local = _local(key)
+    names = [n for n in set(names) if n]
+    missing = [n for n in names if n not in local]
+
+    redis_missing = []
+    for name in missing:
+        value = frappe.cache().hget(key, name)
+        if value is None:
+            redis_missing.append(name)
+        else:
+            local[name] = frappe._dict(value) if value else None
+
+    if redis_missing:
+        found = {r.name: r for r in frappe.get_all(doctype, filters={"name": ["in", redis_missing]}, fields=fields)}
+        for name in redis_missing:
+            value = found.get(name)
+            # cache misses as {} so unknown names are not queried again
+            frappe.cache().hset(key, name, dict(value) if value else {})
+            local[name] = value
+        _expire(key)
+
+    return {n: local.get(n) for n in names}
+
+
+def _expire(key):
+    # field-level TTLs need Redis 7.4, so the hash expires as a whole; a hash already counting
+    # down keeps its TTL, otherwise frequent misses would keep pushing it back
+    cache = frappe.cache()
+    redis_key = cache.make_key(key)
+    if cache.ttl(redis_key) < 0:
+        cache.expire(redis_key, CACHE_TTL)
+
+
+def get_shift_type(name):
+    """Shift Type {name, start_time, end_time} or None."""
+    if not name:
+        return None
+    return _get_many(SHIFT_TYPE_KEY, "Shift Type", SHIFT_TYPE_FIELDS, [name]).get(name)
+
+
+def get_shift_types(names):
+    return _get_many(SHIFT_TYPE_KEY, "Shift Type", SHIFT_TYPE_FIELDS, names)
+
+
+def get_employee_profile(employee):
+    """Employee {name, employee_name, default_shift, holiday_list, user_id, company, department, status} or None."""
+    if not employee:
+        return None
+    return _get_many(EMPLOYEE_PROFILE_KEY, "Employee", EMPLOYEE_PROFILE_FIELDS, [employee]).get(employee)
+
+
+def get_employee_profiles(employees):
+    return _get_many(EMPLOYEE_PROFILE_KEY, "Employee", EMPLOYEE_PROFILE_FIELDS, employees)
+
+
+def clear_shift_type_cache(doc, method=None):
+    """doc_events hook on Shift Type update/trash."""
+    frappe.cache().hdel(SHIFT_TYPE_KEY, doc.name)
+    _local(SHIFT_TYPE_KEY).pop(doc.name, None)
+
+
+def clear_employee_profile_cache(doc, method=None):
+    """doc_events hook on Employee update/trash."""
+    frappe.cache().hdel(EMPLOYEE_PROFILE_KEY, doc.name)
+    _local(EMPLOYEE_PROFILE_KEY).pop(doc.name, None)